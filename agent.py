@@ -0,0 +1,7 @@
+"""Run persistent agent for other scripts."""
+
+from libsilverline import _agent
+
+
+if __name__ == '__main__':
+    _agent._main(_agent._parse().parse_args())
@@ -0,0 +1 @@
+"""Client benchmarks; run each with `python -m benchmarks.{name}`."""
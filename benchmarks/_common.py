@@ -0,0 +1,24 @@
+"""Shared benchmark utilities."""
+
+import time
+import numpy as np
+
+
+def timeit(func, repeat=5):
+    """Time `func()` over `repeat` runs; returns durations in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return np.array(times)
+
+
+def report(name, results, unit="ms", scale=1e3):
+    """Print median/min/max for each result (dict of duration arrays)."""
+    print("{}:".format(name))
+    width = max(len(k) for k in results)
+    for k, v in results.items():
+        print("  {}  median={:.3f}{} min={:.3f}{} max={:.3f}{}".format(
+            k.ljust(width), np.median(v) * scale, unit,
+            np.min(v) * scale, unit, np.max(v) * scale, unit))
@@ -0,0 +1,92 @@
+"""Benchmark handler callback throughput under different logging setups.
+
+Messages are fed directly to `Client.on_message` (no broker); the handler
+logs one DEBUG line per message, and optionally fails every message.
+Console output is discarded; logs are also written to a temporary file.
+"""
+
+import os
+import sys
+import logging
+import tempfile
+
+import paho.mqtt.client as mqtt
+
+from libsilverline import ArgumentParser, BaseHandler, Client, configure_log
+from ._common import timeit, report
+
+
+class _Handler(BaseHandler):
+
+    def __init__(self, fail):
+        self.topic = "benchmark/handler"
+        self.fail = fail
+        self.log = logging.getLogger("handler")
+
+    def handle(self, data):
+        self.log.debug("Received %s", data)
+        if self.fail:
+            raise ValueError("Invalid message")
+
+
+def handler_client(fail=False):
+    """Unconnected client with the benchmark handler registered."""
+    client = Client(connect=False)
+    client.register_handler(_Handler(fail))
+    return client
+
+
+def message(payload=b'{"seq": 1, "data": [1, 2, 3]}'):
+    """Message addressed to the benchmark handler."""
+    msg = mqtt.MQTTMessage(topic=b"benchmark/handler")
+    msg.payload = payload
+    return msg
+
+
+def dispatch(client, msg, n):
+    """Workload: deliver `msg` to `client.on_message` `n` times."""
+    def _inner():
+        for _ in range(n):
+            client.on_message(client, None, msg)
+    return _inner
+
+
+def _parse():
+    p = ArgumentParser(description="Callback logging benchmark.")
+    p.add_argument(
+        "--n", type=int, default=20000, help="Messages per measurement.")
+    p.add_argument("--repeat", type=int, default=5, help="Repetitions.")
+    return p
+
+
+def _main(args):
+    n = args["n"]
+    msg = message()
+
+    stderr = sys.stderr
+    with tempfile.TemporaryDirectory() as tmp, \
+            open(os.devnull, "w") as devnull:
+        for fail in [False, True]:
+            client = handler_client(fail)
+            results = {}
+            for verbose, level in [(2, "INFO"), (3, "DEBUG")]:
+                for queue in [False, True]:
+                    sys.stderr = devnull
+                    try:
+                        configure_log(
+                            log=os.path.join(tmp, "log"), verbose=verbose,
+                            queue=queue, force=True)
+                        results["{}, {}".format(
+                            level, "queue" if queue else "sync")] = timeit(
+                            dispatch(client, msg, n), repeat=args["repeat"])
+                    finally:
+                        client.errors.flush()
+                        configure_log(verbose=0, force=True)
+                        sys.stderr = stderr
+            report("Callback {} (per message)".format(
+                "errors" if fail else "success"), results,
+                unit="us", scale=1e6 / n)
+
+
+if __name__ == '__main__':
+    _main(_parse().parse_args())
@@ -0,0 +1,120 @@
+"""Benchmark payload codecs on representative messages.
+
+Codecs with missing optional dependencies are skipped.
+"""
+
+import uuid
+import numpy as np
+
+from libsilverline import ArgumentParser, Client
+from libsilverline.codec import CODECS, get_codec
+from ._common import timeit, report
+
+
+def payloads():
+    """Representative messages: a control request and a telemetry report."""
+    control = {
+        "object_id": str(uuid.uuid4()),
+        "action": "create",
+        "type": "req",
+        "data": {
+            "type": "module",
+            "parent": str(uuid.uuid4()),
+            "uuid": str(uuid.uuid4()),
+            "name": "module",
+            "filename": "wasm/apps/helloworld.wasm",
+            "args": ["wasm/apps/helloworld.wasm"],
+            "env": [],
+        }
+    }
+    telemetry = {
+        "type": "telemetry",
+        "runtime": str(uuid.uuid4()),
+        "modules": [{
+            "uuid": str(uuid.uuid4()),
+            "wall_time": np.random.randint(0, 1 << 30, size=32).tolist(),
+            "cpu_time": np.random.randint(0, 1 << 30, size=32).tolist(),
+            "memory": int(np.random.randint(0, 1 << 30)),
+        } for _ in range(8)]
+    }
+    return {"control": control, "telemetry": telemetry}
+
+
+def codecs():
+    """Available codecs, skipping those with missing dependencies."""
+    res = {}
+    for name in CODECS:
+        try:
+            res[name] = get_codec(name)
+        except ImportError as e:
+            print("Skipping {}: {}".format(name, e))
+    return res
+
+
+def encoded(name, codec, obj):
+    """Wire payload for `obj` (`raw` passes JSON bytes through)."""
+    if name == "raw":
+        return get_codec("json").encode(obj).encode()
+    payload = codec.encode(obj)
+    return payload.encode() if isinstance(payload, str) else payload
+
+
+def encode(codec, obj, n):
+    """Workload: encode `obj` `n` times."""
+    return lambda: [codec.encode(obj) for _ in range(n)]
+
+
+def decode(codec, payload, n):
+    """Workload: decode `payload` `n` times."""
+    return lambda: [codec.decode(payload) for _ in range(n)]
+
+
+def control(n):
+    """Workload: build and encode `n` module create requests."""
+    client = Client(connect=False)
+    client._control_subscribed = True
+    target = str(uuid.uuid4())
+    data = [client._module_data()[1] for _ in range(n)]
+
+    def _inner():
+        for d in data:
+            client._create_module_message(d, target)
+        client.pending.clear()
+    return _inner
+
+
+def _parse():
+    p = ArgumentParser(description="Codec benchmark.")
+    p.add_argument(
+        "--n", type=int, default=10000, help="Messages per measurement.")
+    p.add_argument("--repeat", type=int, default=5, help="Repetitions.")
+    return p
+
+
+def _main(args):
+    n = args["n"]
+    available = codecs()
+    for pname, obj in payloads().items():
+        enc, dec = {}, {}
+        for name, codec in available.items():
+            payload = encoded(name, codec, obj)
+            if name != "raw":
+                enc[name] = timeit(
+                    encode(codec, obj, n), repeat=args["repeat"])
+            dec[name] = timeit(
+                decode(codec, payload, n), repeat=args["repeat"])
+            print("{} payload, {}: {} bytes".format(
+                pname, name, len(payload)))
+
+        report("Encode {} (per message)".format(pname), enc,
+               unit="us", scale=1e6 / n)
+        report("Decode {} (per message)".format(pname), dec,
+               unit="us", scale=1e6 / n)
+
+    report("Control requests (per message)", {
+        "create_module": timeit(control(n), repeat=args["repeat"])
+    }, unit="us", scale=1e6 / n)
+
+
+if __name__ == '__main__':
+    _main(_parse().parse_args())
@@ -0,0 +1,89 @@
+"""Benchmark `DirichletProcess` sampling against the previous implementation.
+
+The previous implementation rebuilt and renormalized a NumPy weight array,
+and called `np.random.choice`, on every draw.
+"""
+
+import numpy as np
+
+from libsilverline import ArgumentParser
+from libsilverline.data import DirichletProcess, PayloadPool
+from ._common import timeit, report
+
+
+class _LegacyDirichletProcess:
+    """Previous `DirichletProcess.draw` implementation."""
+
+    def __init__(self, prior, alpha=1.):
+        self.tables = []
+        self.values = []
+        self.prior = prior
+        self.alpha = alpha
+
+    def draw(self):
+        weights = [self.alpha] + self.tables
+        weights = np.array(weights) / np.sum(weights)
+        idx = np.random.choice(len(weights), 1, p=weights)[0]
+        if idx == 0:
+            self.tables.append(1)
+            self.values.append(self.prior())
+            return self.values[-1]
+        else:
+            self.tables[idx - 1] += 1
+            return self.values[idx - 1]
+
+
+def _parse():
+    p = ArgumentParser(description="Dirichlet process sampling benchmark.")
+    p.add_argument("--n", type=int, default=100000, help="Number of draws.")
+    p.add_argument(
+        "--alpha", type=float, nargs="+", default=[1., 100.],
+        help="New table probabilities to test.")
+    p.add_argument("--repeat", type=int, default=3, help="Repetitions.")
+    return p
+
+
+def _prior():
+    return np.random.geometric(1 / 1000)
+
+
+def draw(n, alpha=1., cls=DirichletProcess):
+    """Workload: `n` draws from a fresh process."""
+    def _inner():
+        dp = cls(_prior, alpha=alpha)
+        for _ in range(n):
+            dp.draw()
+    return _inner
+
+
+def draw_many(n, alpha=1.):
+    """Workload: `n` draws from a fresh process, in one call."""
+    return lambda: DirichletProcess(_prior, alpha=alpha).draw_many(n)
+
+
+def generate(n, alpha=1., entropy=64):
+    """Workload: `n` payloads generated from a pooled process."""
+    dp = DirichletProcess(
+        _prior, alpha=alpha, pool=PayloadPool(entropy=entropy))
+
+    def _inner():
+        for _ in range(n):
+            dp.generate()
+    return _inner
+
+
+def _main(args):
+    n = args["n"]
+    for alpha in args["alpha"]:
+        report("{} draws, alpha={} (per draw)".format(n, alpha), {
+            "legacy": timeit(
+                draw(n, alpha, cls=_LegacyDirichletProcess),
+                repeat=args["repeat"]),
+            "draw": timeit(draw(n, alpha), repeat=args["repeat"]),
+            "draw_many": timeit(draw_many(n, alpha), repeat=args["repeat"]),
+            "generate": timeit(generate(n, alpha), repeat=args["repeat"])
+        }, unit="us", scale=1e6 / n)
+
+
+if __name__ == '__main__':
+    _main(_parse().parse_args())
@@ -0,0 +1,89 @@
+"""Benchmark REST alias resolution against a local stub HTTP server.
+
+Compares one un-pooled `requests.get` per alias (the previous behavior of
+`OrchestratorMixin._infer`) against the pooled, concurrent `RestSession`.
+"""
+
+import json
+import time
+import multiprocessing as mp
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from libsilverline import ArgumentParser
+from libsilverline.rest import RestSession
+from ._common import timeit, report
+
+
+def _serve(latency, port):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            name = self.path.rstrip("/").split("/")[-1]
+            body = json.dumps({"uuid": name, "name": name}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    port.put(server.server_address[1])
+    server.serve_forever()
+
+
+def _stub_server(latency):
+    """Start stub server in a separate process (so it doesn't hold the GIL).
+
+    Returns
+    -------
+    (multiprocessing.Process, int)
+        Server process and port.
+    """
+    port = mp.Queue()
+    server = mp.Process(target=_serve, args=(latency, port), daemon=True)
+    server.start()
+    return server, port.get()
+
+
+def _parse():
+    p = ArgumentParser(description="REST alias resolution benchmark.")
+    p.add_argument("--n", type=int, default=200, help="Number of aliases.")
+    p.add_argument(
+        "--latency", type=float, default=0.002,
+        help="Simulated server processing time per request, in seconds.")
+    p.add_argument("--repeat", type=int, default=5, help="Repetitions.")
+    p.add_argument("--pool", type=int, default=16, help="Connection pool.")
+    return p
+
+
+def _main(args):
+    server, port = _stub_server(args["latency"])
+    api = "http://127.0.0.1:{}/api".format(port)
+    addresses = ["runtimes/rt{}".format(i) for i in range(args["n"])]
+
+    def _serial():
+        for a in addresses:
+            requests.get("{}/{}/".format(api, a)).json()
+
+    session = RestSession(api, pool=args["pool"])
+
+    report("Resolve {} aliases".format(args["n"]), {
+        "serial": timeit(_serial, repeat=args["repeat"]),
+        "pooled": timeit(
+            lambda: session.get_many(addresses), repeat=args["repeat"])
+    })
+    session.close()
+    server.terminate()
+
+
+if __name__ == '__main__':
+    _main(_parse().parse_args())
@@ -0,0 +1,78 @@
+"""Benchmark topic dispatch and unregistration with many subscriptions.
+
+Compares `TopicRouter` against paho's `MQTTMatcher` (used by
+`message_callback_add`, the previous dispatch path).
+"""
+
+import uuid
+import random
+
+from paho.mqtt.matcher import MQTTMatcher
+
+from libsilverline import ArgumentParser
+from libsilverline.router import TopicRouter
+from ._common import timeit, report
+
+
+def _parse():
+    p = ArgumentParser(description="Topic router benchmark.")
+    p.add_argument(
+        "--subscriptions", type=int, default=10000,
+        help="Number of exact (per-module) subscriptions.")
+    p.add_argument(
+        "--wildcards", type=int, default=100,
+        help="Number of wildcard subscriptions.")
+    p.add_argument(
+        "--n", type=int, default=100000, help="Messages to dispatch.")
+    p.add_argument("--repeat", type=int, default=5, help="Repetitions.")
+    return p
+
+
+def _main(args):
+    modules = [str(uuid.uuid4()) for _ in range(args["subscriptions"])]
+    filters = ["benchmark/out/{}".format(m) for m in modules]
+    for i in range(args["wildcards"]):
+        filters.append("realm/proc/+/{}".format(i))
+        filters.append("telemetry/{}/#".format(i))
+
+    def _cb(*args):
+        pass
+
+    matcher = MQTTMatcher()
+    router = TopicRouter()
+    for f in filters:
+        matcher[f] = _cb
+        router.add(f, _cb)
+
+    topics = ["benchmark/out/{}".format(random.choice(modules))
+              for _ in range(args["n"])]
+    n = len(topics)
+    report("Dispatch, {} filters (per message)".format(len(filters)), {
+        "paho": timeit(
+            lambda: [list(matcher.iter_match(t)) for t in topics],
+            repeat=args["repeat"]),
+        "router": timeit(
+            lambda: [router.match(t) for t in topics],
+            repeat=args["repeat"]),
+    }, unit="us", scale=1e6 / n)
+
+    def _paho_churn():
+        for f in filters:
+            del matcher[f]
+        for f in filters:
+            matcher[f] = _cb
+
+    def _router_churn():
+        for f in filters:
+            router.remove(f)
+        for f in filters:
+            router.add(f, _cb)
+
+    report("Unregister + re-register (per filter)", {
+        "paho": timeit(_paho_churn, repeat=args["repeat"]),
+        "router": timeit(_router_churn, repeat=args["repeat"]),
+    }, unit="us", scale=1e6 / len(filters))
+
+
+if __name__ == '__main__':
+    _main(_parse().parse_args())
@@ -0,0 +1,100 @@
+"""Benchmark profiler send scheduling with many modules.
+
+Simulates N modules which reply instantly, with all replies delivered by a
+single "network thread" (as in paho). Compares the previous behavior of
+sleeping inside the reply callback against scheduling sends with
+`Scheduler`, and reports the achieved per-module period.
+"""
+
+import time
+import queue
+import threading
+import numpy as np
+
+from libsilverline import ArgumentParser
+from libsilverline.profilers import ActiveProfiler
+from libsilverline.scheduler import Scheduler
+
+
+class _EchoClient:
+    """Client stand-in which echoes every publish on one network thread."""
+
+    def __init__(self):
+        self.callbacks = {}
+        self.sends = {}
+        self.queue = queue.Queue()
+        self.done = False
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def register_callback(self, topic, callback):
+        self.callbacks[topic.replace("benchmark/out/", "")] = callback
+
+    def publish(self, topic, payload, qos=0):
+        module = topic.replace("benchmark/in/", "")
+        self.sends[module] = self.sends.get(module, 0) + 1
+        self.queue.put(module)
+
+    def _loop(self):
+        while True:
+            module = self.queue.get()
+            if not self.done:
+                self.callbacks[module](self, None, None)
+
+
+class _SleepProfiler(ActiveProfiler):
+    """Previous behavior: sleep in the network thread, then send."""
+
+    def callback(self, client, userdata, msg):
+        self.idx += 1
+        time.sleep(self.delay)
+        self.send()
+
+
+class _Data:
+    def generate(self):
+        return b">>> "
+
+
+def _measure(profiler, modules, delay, duration):
+    client = _EchoClient()
+    scheduler = Scheduler()
+    for i in range(modules):
+        profiler(
+            client, str(i), data=_Data(), n=1 << 30, delay=delay,
+            scheduler=scheduler)
+    start = time.perf_counter()
+    for i in range(modules):
+        client.publish("benchmark/in/{}".format(i), b"")
+    time.sleep(duration)
+    client.done = True
+    elapsed = time.perf_counter() - start
+    scheduler.stop()
+
+    sends = np.array([client.sends.get(str(i), 0) for i in range(modules)])
+    return elapsed / np.maximum(sends - 1, 1)
+
+
+def _parse():
+    p = ArgumentParser(description="Profiler scheduling benchmark.")
+    p.add_argument(
+        "--modules", type=int, nargs="+", default=[1, 10, 100, 1000],
+        help="Numbers of simulated modules.")
+    p.add_argument(
+        "--delay", type=float, default=0.1, help="Target per-module delay.")
+    p.add_argument(
+        "--duration", type=float, default=2.0, help="Duration of each run.")
+    return p
+
+
+def _main(args):
+    print("Achieved per-module period (target {}s):".format(args["delay"]))
+    for n in args["modules"]:
+        for name, profiler in [
+                ("sleep", _SleepProfiler), ("scheduler", ActiveProfiler)]:
+            period = _measure(profiler, n, args["delay"], args["duration"])
+            print("  {:>5} modules  {:<9}  median={:.4f}s max={:.4f}s".format(
+                n, name, np.median(period), np.max(period)))
+
+
+if __name__ == '__main__':
+    _main(_parse().parse_args())
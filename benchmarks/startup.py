@@ -0,0 +1,60 @@
+"""Benchmark CLI startup time for each entry point.
+
+Runs `python <script> --help` in a fresh interpreter, with a cold (empty)
+and warm argument spec cache; `python -c pass` is the baseline.
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+from libsilverline import ArgumentParser
+from ._common import timeit, report
+
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SCRIPTS = ["run", "list", "reset", "stop_modules", "stop_runtimes"]
+
+
+def _parse():
+    p = ArgumentParser(description="CLI startup benchmark.")
+    p.add_argument(
+        "--scripts", nargs="+", default=_SCRIPTS, help="Entry points.")
+    p.add_argument("--repeat", type=int, default=10, help="Repetitions.")
+    return p
+
+
+def _run(argv, cache):
+    env = dict(os.environ, SILVERLINE_CACHE=cache)
+    subprocess.run(
+        [sys.executable] + argv, cwd=_ROOT, env=env, check=True,
+        stdout=subprocess.DEVNULL)
+
+
+def _main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        report("Interpreter baseline", {
+            "python -c pass": timeit(
+                lambda: _run(["-c", "pass"], tmp), repeat=args["repeat"])})
+
+        for script in args["scripts"]:
+            argv = ["{}.py".format(script), "--help"]
+            cold = os.path.join(tmp, "cold")
+            warm = os.path.join(tmp, "warm")
+            _run(argv, warm)
+
+            def _cold():
+                shutil.rmtree(cold, ignore_errors=True)
+                _run(argv, cold)
+
+            report("{}.py --help".format(script), {
+                "cold cache": timeit(_cold, repeat=args["repeat"]),
+                "warm cache": timeit(
+                    lambda: _run(argv, warm), repeat=args["repeat"]),
+            })
+
+
+if __name__ == '__main__':
+    _main(_parse().parse_args())
@@ -0,0 +1,316 @@
+"""Benchmark suite covering client hot paths, with machine-readable output.
+
+Runs every case offline (loopback cases use an in-process `Simulator`),
+prints a summary, and optionally saves the results as JSON keyed by the
+current git commit::
+
+    python -m benchmarks.suite --save .benchmarks
+    python -m benchmarks.suite --compare .benchmarks/<old>.json \\
+        .benchmarks/<new>.json
+
+All results are seconds per operation; `--compare` reports the ratio of
+medians for each case, and exits with status 1 if any case is slower than
+`--threshold` (e.g. 0.1 = 10%).
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import threading
+import subprocess
+import numpy as np
+
+from libsilverline import ArgumentParser, Client
+from libsilverline.profilers import run_profilers
+from libsilverline.sim import Simulator
+from . import callbacks, codec, dp
+from ._common import timeit, report
+
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CASES = ["dp", "decode", "encode", "loopback", "startup", "profilers"]
+
+
+def _parse():
+    p = ArgumentParser(description="Client benchmark suite.")
+    p.add_argument(
+        "--cases", nargs="+", default=_CASES, help="Cases to run.")
+    p.add_argument(
+        "--quick", action="store_true",
+        help="Smaller workloads, for a fast smoke test.")
+    p.add_argument("--repeat", type=int, default=5, help="Repetitions.")
+    p.add_argument(
+        "--modules", type=int, nargs="+", default=[1, 10, 100, 1000],
+        help="Module counts for profiler scaling.")
+    p.add_argument(
+        "--save", default="",
+        help="Save results to `{save}/{commit}.json`.")
+    p.add_argument(
+        "--compare", nargs="+", default=[],
+        help="Compare a baseline result file against another result file "
+        "(or, if only one is passed, against a fresh run).")
+    p.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="Relative slowdown reported as a regression by `--compare`.")
+    return p
+
+
+def _git(*args):
+    try:
+        return subprocess.run(
+            ["git"] + list(args), cwd=_ROOT, capture_output=True,
+            check=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _environment():
+    """Commit and machine information identifying a result file."""
+    return {
+        "commit": _git("rev-parse", "HEAD") or "unknown",
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# -- Cases --------------------------------------------------------------------
+#
+# Each case returns {name: (durations, operations per run)}. Offline cases
+# reuse the workloads of the per-area benchmarks.
+
+def _case_dp(args):
+    n = 20000 if args["quick"] else 100000
+    return {
+        "dp.draw": (timeit(dp.draw(n), repeat=args["repeat"]), n),
+        "dp.generate": (timeit(dp.generate(n), repeat=args["repeat"]), n)}
+
+
+def _case_decode(args):
+    n = 20000 if args["quick"] else 100000
+    obj = codec.payloads()["control"]
+    available = codec.codecs()
+    res = {}
+    for name, c in available.items():
+        res["codec.decode.{}".format(name)] = (timeit(
+            codec.decode(c, codec.encoded(name, c, obj), n),
+            repeat=args["repeat"]), n)
+    client = callbacks.handler_client()
+    msg = callbacks.message(codec.encoded("json", available["json"], obj))
+    res["handler.on_message"] = (timeit(
+        callbacks.dispatch(client, msg, n), repeat=args["repeat"]), n)
+    return res
+
+
+def _case_encode(args):
+    n = 5000 if args["quick"] else 20000
+    obj = codec.payloads()["control"]
+    res = {}
+    for name, c in codec.codecs().items():
+        if name != "raw":
+            res["codec.encode.{}".format(name)] = (timeit(
+                codec.encode(c, obj, n), repeat=args["repeat"]), n)
+    res["control.encode"] = (
+        timeit(codec.control(n), repeat=args["repeat"]), n)
+    return res
+
+
+def _connect(sim):
+    return Client(cid="benchmark", **sim.client_args())
+
+
+def _case_loopback(args):
+    n = 2000 if args["quick"] else 10000
+    rounds = 200 if args["quick"] else 1000
+    res = {}
+    with Simulator() as sim:
+        client = _connect(sim)
+        try:
+            topic = "benchmark/loopback"
+            for qos in [0, 1]:
+                done = threading.Semaphore(0)
+                count = [0]
+
+                def _count(client, userdata, msg):
+                    count[0] += 1
+                    if count[0] == n:
+                        done.release()
+
+                client.register_callback(topic, _count)
+                client.subscribe_many([topic], qos=qos)
+
+                def _throughput():
+                    count[0] = 0
+                    for _ in range(n):
+                        client.publish(topic, b"x" * 64, qos=qos)
+                    done.acquire()
+
+                res["loopback.qos{}".format(qos)] = (
+                    timeit(_throughput, repeat=args["repeat"]), n)
+                client.unregister_callback(topic)
+
+            # Callback latency: ping-pong with a simulated module
+            modules = client.create_modules_bulk(
+                list(sim.runtimes)[:1], confirm=True)
+            module = next(iter(modules.values()))
+            reply = threading.Semaphore(0)
+            client.register_callback(
+                "benchmark/out/{}".format(module),
+                lambda *args: reply.release())
+            client.subscribe_many(["benchmark/out/{}".format(module)])
+            reply.acquire()
+
+            def _pingpong():
+                for _ in range(rounds):
+                    client.publish(
+                        "benchmark/in/{}".format(module), b"x" * 64, qos=1)
+                    reply.acquire()
+
+            res["loopback.rtt"] = (
+                timeit(_pingpong, repeat=args["repeat"]), rounds)
+            client.publish("benchmark/in/{}".format(module), b"exit", qos=2)
+        finally:
+            client.loop_stop()
+            client.disconnect()
+    return res
+
+
+def _case_startup(args):
+    from libsilverline import _run
+
+    def _build():
+        _run._parse().parse_args([])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, SILVERLINE_CACHE=tmp)
+        argv = [sys.executable, "run.py", "--help"]
+
+        def _help():
+            subprocess.run(
+                argv, cwd=_ROOT, env=env, check=True,
+                stdout=subprocess.DEVNULL)
+
+        _help()
+        _build()
+        return {
+            "startup.parser": (timeit(_build, repeat=args["repeat"]), 1),
+            "startup.run_help": (timeit(_help, repeat=args["repeat"]), 1)}
+
+
+def _case_profilers(args):
+    scales = [k for k in args["modules"] if not args["quick"] or k <= 100]
+    n = 5 if args["quick"] else 20
+    repeat = min(args["repeat"], 3)
+    res = {}
+    with Simulator(runtimes=max(scales)) as sim:
+        client = _connect(sim)
+        runtimes = list(sim.runtimes)
+        try:
+            for k in scales:
+                times = []
+                for _ in range(repeat):
+                    modules = client.create_modules_bulk(
+                        runtimes[:k], confirm=True)
+                    start = time.perf_counter()
+                    run_profilers(
+                        client, modules, type="pipelined", n=n, depth=[1])
+                    times.append(time.perf_counter() - start)
+                res["profilers.pipelined.{}".format(k)] = (
+                    np.array(times), k * n)
+        finally:
+            client.loop_stop()
+            client.disconnect()
+    return res
+
+
+# -- Results ------------------------------------------------------------------
+
+def _run_cases(args):
+    results = {}
+    for case in args["cases"]:
+        if case not in _CASES:
+            raise ValueError("Unknown benchmark case: {}".format(case))
+        for name, (times, ops) in globals()[
+                "_case_{}".format(case)](args).items():
+            per_op = times / ops
+            report(name, {"per op": per_op}, unit="us", scale=1e6)
+            results[name] = {
+                "median": float(np.median(per_op)),
+                "min": float(np.min(per_op)),
+                "max": float(np.max(per_op)),
+                "ops": ops,
+                "samples": per_op.tolist()}
+    return {**_environment(), "results": results}
+
+
+def _save(directory, data):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "{}{}.json".format(
+        data["commit"][:12], "-dirty" if data["dirty"] else ""))
+    with open(path, "w") as f:
+        json.dump(data, f, indent=4)
+    print("Saved results to {}".format(path))
+
+
+def compare(base, new, threshold=0.1):
+    """Compare two result sets.
+
+    Parameters
+    ----------
+    base : dict
+        Baseline results (as saved by `--save`).
+    new : dict
+        New results.
+    threshold : float
+        Relative slowdown (of the median) reported as a regression.
+
+    Returns
+    -------
+    list[str]
+        Cases which regressed.
+    """
+    print("{} -> {}".format(base["commit"][:12], new["commit"][:12]))
+    regressed = []
+    names = [k for k in base["results"] if k in new["results"]]
+    width = max([len(k) for k in names] + [0])
+    for name in names:
+        a = base["results"][name]["median"]
+        b = new["results"][name]["median"]
+        ratio = b / a if a > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        elif ratio < 1 / (1 + threshold):
+            flag = "  improved"
+        print("  {}  {:.3f}us -> {:.3f}us  x{:.2f}{}".format(
+            name.ljust(width), a * 1e6, b * 1e6, ratio, flag))
+    return regressed
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _main(args):
+    if len(args["compare"]) > 2:
+        raise ValueError("--compare takes one or two result files.")
+    if len(args["compare"]) == 2:
+        new = _load(args["compare"][1])
+    else:
+        new = _run_cases(args)
+        if args["save"]:
+            _save(args["save"], new)
+    if args["compare"]:
+        if compare(_load(args["compare"][0]), new, args["threshold"]):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    _main(_parse().parse_args())
@@ -1,16 +1,54 @@
-"""Silverline Python Library."""
+"""Silverline Python Library.
 
-from .client import Client
-from .parse import ArgumentParser
-from .handlers import BaseHandler
-from .logging import configure_log
+Submodules are imported on first access, so that scripts only pay for the
+dependencies (numpy, tqdm, requests, ...) that they actually use.
+"""
 
-from . import _run, _stop_runtimes, _reset, _list, _stop_modules, _save
+import importlib
+
+_exports = {
+    "Client": "client",
+    "AsyncClient": "aio",
+    "ClientPool": "pool",
+    "ArgumentParser": "parse",
+    "BaseHandler": "handlers",
+    "Dispatcher": "dispatch",
+    "get_codec": "codec",
+    "configure_log": "logging",
+    "ResultStore": "store",
+}
+
+_scripts = [
+    "_run", "_stop_runtimes", "_reset", "_list", "_stop_modules", "_save",
+    "_agent", "_sim"]
 
 __all__ = [
     "BaseHandler",
+    "Dispatcher",
+    "get_codec",
     "ArgumentParser",
     "Client",
+    "AsyncClient",
+    "ClientPool",
     "configure_log",
-    "_run", "_stop_runtimes", "_reset", "_list", "_stop_modules", "_save"
+    "ResultStore",
+    "_run", "_stop_runtimes", "_reset", "_list", "_stop_modules", "_save",
+    "_agent", "_sim"
 ]
+
+
+def __getattr__(name):
+    if name in _exports:
+        module = importlib.import_module("." + _exports[name], __name__)
+        value = getattr(module, name)
+    elif name in _scripts:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
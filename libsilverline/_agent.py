@@ -0,0 +1,35 @@
+"""Run the persistent agent."""
+
+from .client import Client
+from .parse import ArgumentParser
+from .agent import Agent
+from .logging import configure_log
+
+
+def _parse():
+    p = ArgumentParser(
+        description="Run a persistent agent holding a connected client; "
+        "other scripts send commands to the agent while it is running, "
+        "instead of connecting directly.")
+    p.add_argument(
+        "--socket", default=None,
+        help="Unix domain socket path (default: $SILVERLINE_AGENT, "
+        "$XDG_RUNTIME_DIR/silverline.sock, or "
+        "/tmp/silverline-{uid}/agent.sock).")
+    p.add_to_parser(
+        "client", Client, group="SilverLine Client", exclude=["connect"])
+    p.add_to_parser(
+        "log", configure_log, group="Logging", exclude=["force"])
+    return p
+
+
+def _main(args):
+    configure_log(**args["log"])
+    agent = Agent(args["client"], path=args["socket"])
+    agent.log.info("Listening on %s", agent.path)
+    try:
+        agent.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        agent.server_close()
@@ -4,6 +4,7 @@ import printtools as pt
 
 from .client import Client
 from .parse import ArgumentParser
+from .agent import command
 
 
 def _parse():
@@ -49,9 +50,9 @@ def _full(runtimes):
                 mod['name'], mod['filename']))
 
 
-def _main(args):
-    client = Client(connect=False, **args["client"])
-    runtimes = client.get_runtimes()
+@command(connect=False)
+def _main(args, client):
+    runtimes = client.iter_runtimes()
 
     if args["style"] == "short":
         _short(runtimes)
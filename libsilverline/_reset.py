@@ -4,6 +4,7 @@ import json
 
 from .client import Client
 from .parse import ArgumentParser
+from .agent import command
 
 
 def _parse():
@@ -13,10 +14,19 @@ def _parse():
     p.add_argument(
         "--metadata", help="Message metadata (JSON encoded)",
         default='{"metadata": null}')
+    p.add_argument(
+        "--timeout", type=float, default=0.,
+        help="Seconds to wait for the orchestrator to respond; does not "
+        "wait if 0.")
     return p
 
 
-def _main(args):
-    client = Client(**args["client"])
-    client.reset(json.loads(args["metadata"]))
-    client.loop_stop()
+@command()
+def _main(args, client):
+    req = client.reset(json.loads(args["metadata"]))
+    if args["timeout"] > 0:
+        done, _ = client.wait_requests([req], timeout=args["timeout"])
+        if done:
+            print("Response received after {:.3f}s".format(req.latency))
+        else:
+            print("No response after {}s".format(args["timeout"]))
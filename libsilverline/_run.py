@@ -1,8 +1,12 @@
 """Run and test runtime."""
 
+import time
+
 from .client import Client
+from .pool import ClientPool
 from .profilers import run_profilers
 from .parse import ArgumentParser
+from .agent import command
 
 
 def _parse():
@@ -15,6 +19,17 @@ def _parse():
     p.add_argument(
         "--path", nargs="+", default=["wasm/apps/helloworld.wasm"],
         help="Target file paths, relative to WASM/WASI base directory")
+    p.add_argument(
+        "--bulk", action="store_true",
+        help="Pipeline module creation, and wait for all create requests to "
+        "be delivered before profiling.")
+    p.add_argument(
+        "--inflight", type=int, default=64,
+        help="Maximum outstanding create requests in bulk mode.")
+    p.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of client processes; if more than 1, modules are "
+        "sharded across a `ClientPool`.")
     p.add_to_parser(
         "client", Client, group="SilverLine Client", exclude=["connect"])
     p.add_to_parser(
@@ -26,14 +41,52 @@ def _parse():
     return p
 
 
-def _main(args):
-    client = Client(**args["client"])
+def _pool(args):
+    if args["workers"] > 1:
+        return ClientPool(workers=args["workers"], **args["client"])
+    return None
+
+
+@command(factory=_pool)
+def _main(args, client):
     modules = {}
+    start = time.perf_counter()
     for p in args["path"]:
         runtimes = client.infer_runtimes(args["runtime"])
         print("Creating {} / {} modules:\n{} --> {}".format(
             len(runtimes), len(args["runtime"]), args["runtime"], runtimes))
-        modules.update(
-            client.create_modules(runtimes, path=p, **args["module"]))
-    run_profilers(client, modules, **args["profile"])
-    client.loop_stop()
+        if isinstance(client, ClientPool):
+            bulk = {"inflight": args["inflight"]} if args["bulk"] else {}
+            modules.update(client.create_modules(
+                runtimes, path=p, bulk=args["bulk"], **bulk,
+                **args["module"]))
+        elif args["bulk"]:
+            modules.update(client.create_modules_bulk(
+                runtimes, path=p, inflight=args["inflight"],
+                **args["module"]))
+        else:
+            modules.update(
+                client.create_modules(runtimes, path=p, **args["module"]))
+    print("Setup latency: {:.3f}s ({} modules)".format(
+        time.perf_counter() - start, len(modules)))
+    if isinstance(client, ClientPool):
+        results = client.run_profilers(modules, **args["profile"])
+    else:
+        results = run_profilers(client, modules, **args["profile"])
+    for module, res in results.items():
+        print("{}: n={} p50={:.3f}ms p90={:.3f}ms p99={:.3f}ms max={:.3f}ms"
+              .format(module[-4:], res["n"], *[
+                  res[k] / 1e6 for k in ["p50", "p90", "p99", "max"]]))
+        if "throughput" in res:
+            for d, t, lat in zip(
+                    res["depth"], res["throughput"], res["depth_p50"]):
+                print("    depth={} throughput={:.1f}/s p50={:.3f}ms".format(
+                    d, t, lat / 1e6))
+        if "rate" in res:
+            print("    sent={} late={} dropped={} rate={:.1f}/s".format(
+                res["sent"], res["late"], res["dropped"], res["rate"]))
+    if isinstance(client, ClientPool) and len(results) > 1:
+        total = client.aggregate(results)
+        print("all: n={} p50={:.3f}ms p90={:.3f}ms p99={:.3f}ms max={:.3f}ms"
+              .format(total["n"], *[
+                  total[k] / 1e6 for k in ["p50", "p90", "p99", "max"]]))
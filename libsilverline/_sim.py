@@ -0,0 +1,39 @@
+"""Run offline simulator."""
+
+import json
+import time
+
+from .parse import ArgumentParser
+from .sim import Simulator
+from .logging import configure_log
+
+
+def _parse():
+    p = ArgumentParser(
+        description="Run an offline simulator (MQTT broker, REST API, and "
+        "runtimes) for testing without a SilverLine deployment.")
+    p.add_argument(
+        "--save", default="",
+        help="Save client options as a config file for other scripts "
+        "(`--config`).")
+    p.add_to_parser("sim", Simulator, group="Simulator")
+    p.add_to_parser(
+        "log", configure_log, group="Logging", exclude=["force"])
+    return p
+
+
+def _main(args):
+    configure_log(**args["log"])
+    sim = Simulator(**args["sim"]).start()
+    config = sim.client_args()
+    print(json.dumps(config))
+    if args["save"]:
+        with open(args["save"], "w") as f:
+            json.dump(config, f, indent=4)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sim.stop()
@@ -2,23 +2,32 @@
 
 from .client import Client
 from .parse import ArgumentParser
+from .agent import command
+from ._teardown import _targets, _report
 
 
 def _parse():
     p = ArgumentParser(
-        description="Send DELETE_RUNTIME signal to specified module.")
+        description="Send DELETE_MODULE signal to specified modules, or to "
+        "all modules with `--all`.")
     p.add_argument(
         "--module", nargs="+", default=[],
         help="Modules to stop. Modules can be specified by name, UUID, or "
         "last 4 characters of UUID.")
+    p.add_argument(
+        "--all", action="store_true", help="Stop all modules.")
+    p.add_to_parser(
+        "teardown", Client.delete_modules_bulk, group="Teardown",
+        exclude=["modules"])
     p.add_to_parser(
         "client", Client, group="SilverLine Client", exclude=["connect"])
     return p
 
 
-def _main(args):
-    client = Client(**args["client"])
-    modules = client.infer_modules(args["module"])
-    for mod in modules:
-        client.delete_module(mod)
-    client.loop_stop()
+@command()
+def _main(args, client):
+    modules, names = _targets(
+        client.module_registry, None if args["all"] else args["module"],
+        client.infer_modules)
+    print("Stopping {} modules".format(len(modules)))
+    _report(client.delete_modules_bulk(modules, **args["teardown"]), names)
@@ -2,6 +2,8 @@
 
 from .client import Client
 from .parse import ArgumentParser
+from .agent import command
+from ._teardown import _targets, _report
 
 
 def _parse():
@@ -12,23 +14,21 @@ def _parse():
         "--runtime", nargs="+", default=[],
         help="Runtimes to stop; if empty, stops all runtimes. Runtimes can be "
         "specified by name, UUID, or last 4 characters of UUID.")
+    p.add_to_parser(
+        "teardown", Client.delete_runtimes_bulk, group="Teardown",
+        exclude=["runtimes"])
     p.add_to_parser(
         "client", Client, group="SilverLine Client", exclude=["connect"])
     return p
 
 
-def _main(args):
-    client = Client(**args["client"])
-    if len(args["runtime"]) > 0:
-        runtimes = client.infer_runtimes(args["runtime"])
-        for rt in runtimes:
-            print("Stopping runtime {}".format(rt))
-            client.delete_runtime(rt)
+@command()
+def _main(args, client):
+    runtimes, names = _targets(
+        client.runtime_registry, args["runtime"] or None,
+        client.infer_runtimes)
+    if args["runtime"]:
+        print("Stopping {} runtimes".format(len(runtimes)))
     else:
-        runtimes = client.get_runtimes()
-        print("Stopping all runtimes:")
-        for rt in runtimes:
-            print("Stopping runtime {} [{}]".format(rt["name"], rt["uuid"]))
-            client.delete_runtime(rt["uuid"])
-
-    client.loop_stop()
+        print("Stopping all {} runtimes".format(len(runtimes)))
+    _report(client.delete_runtimes_bulk(runtimes, **args["teardown"]), names)
@@ -0,0 +1,38 @@
+"""Shared helpers for the teardown scripts (stop_modules, stop_runtimes)."""
+
+
+def _targets(registry, aliases, infer):
+    """Resolve targets (all if `aliases` is None) and their names."""
+    if aliases is None:
+        registry.invalidate()
+        targets = [rec["uuid"] for rec in registry.list()]
+    else:
+        targets = infer(aliases)
+    names = {}
+    for t in targets:
+        rec = registry.resolve(t)
+        names[t] = "?" if rec is None else rec["name"]
+    return targets, names
+
+
+def _report(results, names):
+    """Print per-target teardown results and a latency summary."""
+    for target, res in results.items():
+        if res["ok"]:
+            print("{} [{}]: ok {:.3f}ms".format(
+                target, names[target], res["latency"] * 1e3))
+        else:
+            print("{} [{}]: FAILED ({})".format(
+                target, names[target], res["error"]))
+    latency = [r["latency"] * 1e3 for r in results.values() if r["ok"]]
+    if len(latency) == 0:
+        print("Stopped 0 / {}".format(len(results)))
+        return
+
+    # Deferred: numpy is slow to import, and not needed for `--help`.
+    from .latency import summarize
+    stats = summarize(latency)
+    print("Stopped {} / {}: p50={:.3f}ms p90={:.3f}ms p99={:.3f}ms "
+          "max={:.3f}ms".format(
+              stats["n"], len(results),
+              *[stats[k] for k in ["p50", "p90", "p99", "max"]]))
@@ -0,0 +1,270 @@
+"""Persistent agent holding a warm Client for CLI commands."""
+
+import os
+import sys
+import json
+import socket
+import logging
+import functools
+import importlib
+import traceback
+import socketserver
+from contextlib import redirect_stdout, redirect_stderr
+
+
+_COMMANDS = {
+    "_run", "_stop_runtimes", "_reset", "_list", "_stop_modules", "_save"}
+
+
+def socket_path():
+    """Get agent socket path.
+
+    Set by `SILVERLINE_AGENT`; the agent is disabled if it is set to an
+    empty string. Defaults to `$XDG_RUNTIME_DIR/silverline.sock`, or
+    `/tmp/silverline-{uid}/agent.sock` (in a private directory).
+    """
+    path = os.environ.get("SILVERLINE_AGENT")
+    if path is not None:
+        return path
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "silverline.sock")
+    return "/tmp/silverline-{}/agent.sock".format(os.getuid())
+
+
+def _config(client_args, cwd):
+    """Normalize client arguments for comparison between processes."""
+    config = {k: v for k, v in client_args.items() if k != "cid"}
+    if config.get("pwd"):
+        config["pwd"] = os.path.abspath(os.path.join(cwd, config["pwd"]))
+    return config
+
+
+class _Stream:
+    """File-like object forwarding writes to the CLI as JSON lines."""
+
+    def __init__(self, wfile, key):
+        self.wfile = wfile
+        self.key = key
+
+    def write(self, text):
+        if text:
+            self.wfile.write(
+                (json.dumps({self.key: text}) + "\n").encode())
+        return len(text)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def isatty(self):
+        return False
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def _send(self, **kwargs):
+        self.wfile.write((json.dumps(kwargs) + "\n").encode())
+
+    def handle(self):
+        agent = self.server.agent
+        try:
+            request = json.loads(self.rfile.readline())
+            command, args = request["command"], request["args"]
+            cwd = request.get("cwd", agent.cwd)
+        except (ValueError, KeyError, TypeError):
+            return self._send(error="Invalid request.")
+
+        if command not in _COMMANDS:
+            return self._send(error="Unknown command: {}".format(command))
+        if _config(args["client"], cwd) != agent.config:
+            return self._send(reject="Client configuration does not match.")
+
+        agent.log.info("Running %s (cwd=%s)", command, cwd)
+        stdout = _Stream(self.wfile, "out")
+        stderr = _Stream(self.wfile, "err")
+        try:
+            module = importlib.import_module(
+                "." + command, __name__.rsplit(".", 1)[0])
+            os.chdir(cwd)
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                module._main(args, client=agent.client)
+            self._send(exit=0)
+        except (BrokenPipeError, ConnectionResetError):
+            agent.log.warning("%s: CLI disconnected.", command)
+        except SystemExit as e:
+            # e.g. `sys.exit` or an argparse error; don't take the agent down
+            try:
+                if e.code is None or isinstance(e.code, int):
+                    self._send(exit=e.code or 0)
+                else:
+                    self._send(exit=1, error="{}\n".format(e.code))
+            except OSError:
+                pass
+        except Exception:
+            agent.log.error(traceback.format_exc())
+            try:
+                self._send(exit=1, error=traceback.format_exc())
+            except OSError:
+                pass
+        finally:
+            os.chdir(agent.cwd)
+
+
+class Agent(socketserver.UnixStreamServer):
+    """Local agent serving CLI commands with one long-lived Client.
+
+    Commands are `_main` functions of the script modules; they are run one at
+    a time, with output streamed back to the CLI. Commands whose client
+    arguments don't match the agent's are rejected, so the CLI falls back to
+    connecting directly.
+
+    Parameters
+    ----------
+    client_args : dict
+        Arguments for `Client`.
+    path : str
+        Unix domain socket path; see `socket_path` for the default.
+    """
+
+    def __init__(self, client_args, path=None):
+        from .client import Client
+
+        self.log = logging.getLogger("agent")
+        self.cwd = os.getcwd()
+        self.path = socket_path() if path is None else path
+        self.config = _config(client_args, self.cwd)
+        self.client = Client(**client_args)
+
+        if os.path.exists(self.path):
+            if _ping(self.path):
+                raise ValueError(
+                    "An agent is already running at {}.".format(self.path))
+            os.unlink(self.path)
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory, mode=0o700)
+
+        # Socket is created with the umask applied, so it is never
+        # accessible to other users (not even between bind and chmod).
+        umask = os.umask(0o177)
+        try:
+            super().__init__(self.path, _Handler)
+        finally:
+            os.umask(umask)
+        self.agent = self
+
+    def server_close(self):
+        """Close socket and disconnect client."""
+        super().server_close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.client.disconnect()
+        self.client.loop_stop()
+
+
+def _connect(path):
+    # Only talk to sockets we own: another user could otherwise create the
+    # socket first, and receive our commands.
+    try:
+        if os.stat(path).st_uid != os.getuid():
+            return None
+    except OSError:
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def _ping(path):
+    sock = _connect(path)
+    if sock is None:
+        return False
+    sock.close()
+    return True
+
+
+def forward(command, args, path=None):
+    """Run command on the agent, if one is running.
+
+    Parameters
+    ----------
+    command : str
+        Script module name (e.g. `_list`).
+    args : dict
+        Parsed arguments (`ArgumentParser.parse_args` output).
+    path : str
+        Agent socket path; see `socket_path` for the default.
+
+    Returns
+    -------
+    bool
+        True if the agent ran the command; False if no agent is running or
+        the agent rejected the command.
+    """
+    path = socket_path() if path is None else path
+    if not path:
+        return False
+    sock = _connect(path)
+    if sock is None:
+        return False
+
+    with sock, sock.makefile("rwb") as f:
+        f.write((json.dumps({
+            "command": command, "args": args, "cwd": os.getcwd()
+        }) + "\n").encode())
+        f.flush()
+        for line in f:
+            msg = json.loads(line)
+            if "out" in msg:
+                sys.stdout.write(msg["out"])
+            elif "err" in msg:
+                sys.stderr.write(msg["err"])
+            elif "reject" in msg:
+                return False
+            else:
+                if msg.get("error"):
+                    sys.stderr.write(msg["error"])
+                if msg.get("exit", 1) != 0:
+                    raise SystemExit(msg.get("exit", 1))
+                return True
+    raise SystemExit("Agent disconnected.")
+
+
+def command(connect=True, factory=None):
+    """Decorator for script `_main(args, client)` functions.
+
+    If `_main` is called without a client, the command is forwarded to the
+    agent if one is running; otherwise, a new client is created for the
+    duration of the command.
+
+    Parameters
+    ----------
+    connect : bool
+        Whether the command needs an MQTT connection.
+    factory : callable
+        Optional `factory(args)` returning a client to use instead of a
+        `Client`, or None. Commands are not forwarded if it returns a client.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(args, client=None):
+            if client is not None:
+                return func(args, client)
+
+            client = factory(args) if factory is not None else None
+            if client is None:
+                if forward(func.__module__.rsplit(".", 1)[-1], args):
+                    return
+                from .client import Client
+                client = Client(connect=connect, **args["client"])
+            try:
+                return func(args, client)
+            finally:
+                if connect:
+                    client.loop_stop()
+        return wrapper
+    return decorator
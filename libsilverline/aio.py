@@ -0,0 +1,232 @@
+"""Asyncio interface for SilverLine Client."""
+
+import asyncio
+import logging
+import functools
+
+import paho.mqtt.client as mqtt
+
+from .client import Client
+from .logging import ErrorLimiter
+
+
+class AsyncClient:
+    """Asyncio SilverLine Interface Python Client.
+
+    Wraps a `Client`, driving its MQTT socket from the asyncio event loop
+    instead of a `loop_start()` network thread; all MQTT callbacks run on
+    the event loop. Orchestrator and profiler requests are coroutines which
+    wait for the orchestrator's response, and blocking REST calls are run
+    in the loop's default executor.
+
+    Parameters
+    ----------
+    mqtt : str
+        MQTT host server address.
+    mqtt_port : int
+        MQTT host server port.
+    pwd : str
+        MQTT password file.
+    mqtt_username : str
+        MQTT username
+    use_ssl : bool
+        Use SSL (mqtt-secure) if True.
+    kwargs : dict
+        Other arguments passed on to `Client`; `connect` is ignored.
+    """
+
+    def __init__(
+            self, mqtt="localhost", mqtt_port=1883, pwd="mqtt_pwd.txt",
+            mqtt_username="cli", use_ssl=False, **kwargs):
+        kwargs.pop("connect", None)
+        self.client = Client(connect=False, **kwargs)
+        self.client.login(
+            pwd=pwd, mqtt_username=mqtt_username, use_ssl=use_ssl)
+        self.server = (mqtt, mqtt_port)
+
+        self.log = logging.getLogger('aio')
+        self.errors = ErrorLimiter(self.log)
+        self.loop = None
+        self._misc = None
+        self._connected = None
+
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_register_write
+        self.client.on_socket_unregister_write = self._on_unregister_write
+
+    def _on_socket_open(self, client, userdata, sock):
+        self.loop.add_reader(sock, client.loop_read)
+        self._misc = self.loop.create_task(self._misc_loop())
+
+    def _on_socket_close(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+        if self._misc is not None:
+            self._misc.cancel()
+
+    def _on_register_write(self, client, userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def _on_unregister_write(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    async def _misc_loop(self):
+        """Keepalives and QoS retries (normally done by the network thread)."""
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                break
+
+    def _on_connect(self, mqttc, obj, flags, rc):
+        Client.on_connect(self.client, mqttc, obj, flags, rc)
+        if not self._connected.done():
+            if rc == mqtt.CONNACK_ACCEPTED:
+                self._connected.set_result(rc)
+            else:
+                self._connected.set_exception(ConnectionError(
+                    mqtt.connack_string(rc)))
+
+    async def connect(self, timeout=10.):
+        """Connect to MQTT server, and wait for the connection to complete."""
+        self.loop = asyncio.get_running_loop()
+        self._connected = self.loop.create_future()
+        self.client.on_connect = self._on_connect
+
+        self.client.connect(*self.server, 60)
+        await asyncio.wait_for(self._connected, timeout)
+        # Subscribe here, on the loop thread: `infer_*` run `Client._infer`
+        # in an executor, and paho socket callbacks must not fire there.
+        self.client._subscribe_responses()
+
+    async def disconnect(self):
+        """Disconnect from MQTT server."""
+        self.client.disconnect()
+        if self._misc is not None:
+            await asyncio.gather(self._misc, return_exceptions=True)
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.disconnect()
+
+    async def _wait(self, req, timeout=None):
+        """Wait for control request response; returns the request."""
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(req)), timeout)
+        except asyncio.TimeoutError:
+            self.client.cancel_request(req)
+            raise
+        return req
+
+    async def _run(self, func, *args, **kwargs):
+        """Run blocking function in the default executor."""
+        return await self.loop.run_in_executor(
+            None, functools.partial(func, *args, **kwargs))
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        """Publish message (non-blocking)."""
+        return self.client.publish(topic, payload, qos=qos, retain=retain)
+
+    def register_callback(self, topic, callback):
+        """Subscribe to topic and register callback for that topic."""
+        self.client.register_callback(topic, callback)
+
+    def register_handler(self, handler, catch=True):
+        """Subscribe and register callback for handler.
+
+        `handler.handle` may be a coroutine function, in which case each
+        message is handled in a new task.
+
+        Parameters
+        ----------
+        handler : BaseHandler
+            Message handler to register.
+        catch : bool
+            If True, catches and logs errors; otherwise, raises like usual.
+        """
+        def _done(task, topic):
+            if not task.cancelled() and task.exception() is not None:
+                self.log.error("%s @ %s", task.exception(), topic)
+
+        def _handle(client, userdata, msg, handler=handler):
+            try:
+                res = handler.handle(handler.decode(client, userdata, msg))
+                if asyncio.iscoroutine(res):
+                    task = self.loop.create_task(res)
+                    if catch:
+                        task.add_done_callback(
+                            functools.partial(_done, topic=msg.topic))
+            except Exception as e:
+                if catch:
+                    self.errors.error(
+                        (handler.topic, type(e)), "%s @ %s: %s", e,
+                        msg.topic, msg.payload[:64])
+                else:
+                    raise
+        self.register_callback(handler.topic, _handle)
+
+    async def create_module(self, runtime, timeout=None, **kwargs):
+        """Create module; see `Client.create_module`.
+
+        Returns
+        -------
+        ControlRequest
+            Completed request; the created module's ID is `.uuid`.
+        """
+        return await self._wait(
+            self.client.create_module(runtime, **kwargs), timeout=timeout)
+
+    async def create_modules(
+            self, runtimes, path="wasm/apps/helloworld.wasm", timeout=None,
+            **kwargs):
+        """Create multiple modules concurrently; returns UUIDs as a dict."""
+        reqs = await asyncio.gather(*[
+            self.create_module(rt, path=path, timeout=timeout, **kwargs)
+            for rt in runtimes])
+        return {(rt, path): req.uuid for rt, req in zip(runtimes, reqs)}
+
+    async def delete_module(self, module, timeout=None):
+        """Delete module."""
+        return await self._wait(
+            self.client.delete_module(module), timeout=timeout)
+
+    async def delete_runtime(self, target, name="test", timeout=None):
+        """Instruct runtime to exit."""
+        return await self._wait(
+            self.client.delete_runtime(target, name=name), timeout=timeout)
+
+    async def reset(self, metadata, timeout=None):
+        """Reset profiler state."""
+        return await self._wait(self.client.reset(metadata), timeout=timeout)
+
+    async def save(self, metadata, timeout=None):
+        """Save profiler state."""
+        return await self._wait(self.client.save(metadata), timeout=timeout)
+
+    async def infer_runtimes(self, runtimes):
+        """Infer runtime UUIDs; see `Client.infer_runtimes`."""
+        return await self._run(self.client.infer_runtimes, runtimes)
+
+    async def infer_modules(self, modules):
+        """Infer module UUIDs."""
+        return await self._run(self.client.infer_modules, modules)
+
+    async def get_runtimes(self):
+        """Get runtimes from REST API."""
+        return await self._run(self.client.get_runtimes)
+
+    async def get_modules(self):
+        """Get modules from REST API."""
+        return await self._run(self.client.get_modules)
+
+    async def get_runtime(self, rt):
+        """Get runtime full metadata from REST API."""
+        return await self._run(self.client.get_runtime, rt)
+
+    async def get_module(self, mod):
+        """Get module full metadata from REST API."""
+        return await self._run(self.client.get_module, mod)
@@ -0,0 +1,277 @@
+"""Minimal in-process MQTT 3.1.1 broker for offline testing."""
+
+import asyncio
+import logging
+import threading
+
+from .router import TopicRouter
+
+
+CONNECT, CONNACK, PUBLISH, PUBACK, PUBREC, PUBREL, PUBCOMP = range(1, 8)
+SUBSCRIBE, SUBACK, UNSUBSCRIBE, UNSUBACK, PINGREQ, PINGRESP, DISCONNECT = \
+    range(8, 15)
+
+
+def _length(n):
+    """Encode MQTT remaining length."""
+    out = bytearray()
+    while True:
+        n, byte = divmod(n, 128)
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return bytes(out)
+
+
+def _packet(ptype, body, flags=0):
+    return bytes([(ptype << 4) | flags]) + _length(len(body)) + body
+
+
+def _string(s):
+    s = s.encode()
+    return len(s).to_bytes(2, "big") + s
+
+
+class LocalSubscriber:
+    """Subscriber inside the broker's event loop.
+
+    Parameters
+    ----------
+    callback : callable
+        Called as `callback(topic, payload)` in the broker thread for each
+        matching message.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def deliver(self, topic, payload, qos):
+        self.callback(topic, payload)
+
+
+class _Session:
+    """Connected network client."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.filters = {}
+        self._mid = 0
+
+    def send(self, data):
+        self.writer.write(data)
+
+    def deliver(self, topic, payload, qos):
+        if qos > 0:
+            self._mid = self._mid % 65535 + 1
+            body = _string(topic) + self._mid.to_bytes(2, "big") + payload
+        else:
+            body = _string(topic) + payload
+        self.send(_packet(PUBLISH, body, flags=qos << 1))
+
+
+class Broker:
+    """Minimal MQTT 3.1.1 broker running in a background thread.
+
+    Supports CONNECT, SUBSCRIBE/UNSUBSCRIBE (with `+` and `#` wildcards),
+    PUBLISH at QoS 0, 1, and 2, PINGREQ, and DISCONNECT. Sessions are always
+    clean; retained messages, wills, authentication, and retransmission are
+    not supported (and not needed over loopback). Deliveries are downgraded
+    to the subscription QoS.
+
+    Components running inside the broker (e.g. simulated runtimes) use
+    `subscribe_local` and `publish`, which must be called from the broker
+    thread (see `call_soon`).
+
+    Parameters
+    ----------
+    host : str
+        Address to listen on.
+    port : int
+        Port to listen on; 0 picks a free port (see `port` after `start`).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.host = host
+        self.port = port
+        self.log = logging.getLogger("broker")
+
+        # Topic filter -> {subscriber: qos}
+        self.filters = {}
+        self.router = TopicRouter()
+        self.subscribe_hooks = []
+
+        self.loop = None
+        self._server = None
+        self._thread = None
+
+    # -- Subscriptions ------------------------------------------------------
+
+    def _add(self, topic, subscriber, qos=2):
+        subs = self.filters.get(topic)
+        if subs is None:
+            subs = self.filters[topic] = {}
+            self.router.add(topic, subs)
+        subs[subscriber] = qos
+
+    def _remove(self, topic, subscriber):
+        subs = self.filters.get(topic)
+        if subs is not None:
+            subs.pop(subscriber, None)
+            if not subs:
+                del self.filters[topic]
+                self.router.remove(topic)
+
+    def subscribe_local(self, topic, callback):
+        """Subscribe a `LocalSubscriber`; returns the subscriber."""
+        sub = LocalSubscriber(callback)
+        self._add(topic, sub)
+        return sub
+
+    def unsubscribe_local(self, topic, subscriber):
+        """Remove a local subscription."""
+        self._remove(topic, subscriber)
+
+    def publish(self, topic, payload, qos=0):
+        """Route a message to all matching subscribers."""
+        matches = self.router.match(topic)
+        if len(matches) == 1:
+            targets = matches[0]
+        else:
+            targets = {}
+            for subs in matches:
+                for sub, sub_qos in subs.items():
+                    targets[sub] = max(targets.get(sub, 0), sub_qos)
+        for sub, sub_qos in list(targets.items()):
+            sub.deliver(topic, payload, min(qos, sub_qos))
+
+    def call_soon(self, func, *args):
+        """Run `func(*args)` in the broker thread."""
+        self.loop.call_soon_threadsafe(func, *args)
+
+    # -- Network clients ----------------------------------------------------
+
+    async def _read(self, reader):
+        header, byte = await reader.readexactly(2)
+        length, mult = byte & 0x7F, 128
+        while byte & 0x80:
+            byte = (await reader.readexactly(1))[0]
+            length += (byte & 0x7F) * mult
+            mult *= 128
+        body = await reader.readexactly(length) if length else b""
+        return header >> 4, header & 0x0F, body
+
+    def _on_publish(self, session, flags, body):
+        qos = (flags >> 1) & 0x03
+        n = int.from_bytes(body[:2], "big")
+        topic = body[2:2 + n].decode()
+        pos = 2 + n
+        if qos > 0:
+            mid = body[pos:pos + 2]
+            pos += 2
+            session.send(_packet(PUBACK if qos == 1 else PUBREC, mid))
+        self.publish(topic, body[pos:], qos)
+
+    def _on_subscribe(self, session, body):
+        mid, pos, granted, topics = body[:2], 2, [], []
+        while pos < len(body):
+            n = int.from_bytes(body[pos:pos + 2], "big")
+            topic = body[pos + 2:pos + 2 + n].decode()
+            qos = min(body[pos + 2 + n], 2)
+            pos += 3 + n
+            session.filters[topic] = qos
+            self._add(topic, session, qos)
+            granted.append(qos)
+            topics.append(topic)
+        session.send(_packet(SUBACK, mid + bytes(granted)))
+        for topic in topics:
+            for hook in self.subscribe_hooks:
+                hook(topic)
+
+    def _on_unsubscribe(self, session, body):
+        pos = 2
+        while pos < len(body):
+            n = int.from_bytes(body[pos:pos + 2], "big")
+            topic = body[pos + 2:pos + 2 + n].decode()
+            pos += 2 + n
+            session.filters.pop(topic, None)
+            self._remove(topic, session)
+        session.send(_packet(UNSUBACK, body[:2]))
+
+    async def _serve(self, reader, writer):
+        session = _Session(writer)
+        try:
+            while True:
+                ptype, flags, body = await self._read(reader)
+                if ptype == CONNECT:
+                    session.send(_packet(CONNACK, b"\x00\x00"))
+                elif ptype == PUBLISH:
+                    self._on_publish(session, flags, body)
+                elif ptype == PUBREC:
+                    session.send(_packet(PUBREL, body[:2], flags=0x02))
+                elif ptype == PUBREL:
+                    session.send(_packet(PUBCOMP, body[:2]))
+                elif ptype == SUBSCRIBE:
+                    self._on_subscribe(session, body)
+                elif ptype == UNSUBSCRIBE:
+                    self._on_unsubscribe(session, body)
+                elif ptype == PINGREQ:
+                    session.send(_packet(PINGRESP, b""))
+                elif ptype == DISCONNECT:
+                    break
+                if writer.transport.get_write_buffer_size() > (1 << 20):
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError,
+                asyncio.CancelledError):
+            pass
+        finally:
+            for topic in session.filters:
+                self._remove(topic, session)
+            writer.close()
+
+    # -- Lifecycle ----------------------------------------------------------
+
+    def start(self):
+        """Start broker thread; returns once the broker is listening."""
+        ready = threading.Event()
+        error = []
+
+        async def _start():
+            self._server = await asyncio.start_server(
+                self._serve, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+
+        def _run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.loop.run_until_complete(_start())
+            except OSError as e:
+                error.append(e)
+                self.loop.close()
+                return
+            finally:
+                ready.set()
+            self.loop.run_forever()
+            self._server.close()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(
+                asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.close()
+
+        self._thread = threading.Thread(
+            target=_run, name="broker", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if error:
+            self.loop = None
+            raise error[0]
+        self.log.info("MQTT broker listening on %s:%d", self.host, self.port)
+        return self
+
+    def stop(self):
+        """Stop broker thread."""
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self.loop = None
@@ -1,18 +1,28 @@
 """SilverLine system interface."""
 
 import ssl
+import time
 import uuid
+import weakref
 import logging
-import traceback
 
-from threading import Semaphore
+from collections import deque
+from contextlib import contextmanager
+from threading import Semaphore, Lock, Condition
 import paho.mqtt.client as mqtt
 
 from .orchestrator import OrchestratorMixin
 from .profile import ProfileMixin
+from .control import ControlMixin
+from .rest import RestSession
+from .registry import Registry
+from .codec import get_codec
+from .router import TopicRouter
+from .metrics import Metrics
+from .logging import ErrorLimiter
 
 
-class Client(mqtt.Client, OrchestratorMixin, ProfileMixin):
+class Client(mqtt.Client, OrchestratorMixin, ProfileMixin, ControlMixin):
     """SilverLine Interface Python Client.
 
     This class provides access to Silverline Services REST and Pubsub APIs;
@@ -34,12 +44,23 @@ class Client(mqtt.Client, OrchestratorMixin, ProfileMixin):
         Orchestrator HTTP server address.
     http_port : int
         Orchestrator HTTP server port.
+    http_timeout : float
+        Orchestrator REST API request timeout, in seconds.
+    http_retries : int
+        Number of retries for failed REST API requests.
+    http_pool : int
+        Maximum number of pooled (keep-alive) REST API connections.
+    cache_ttl : float
+        Time in seconds to cache runtime and module listings for; listings
+        are also invalidated when create/delete control messages are seen.
     pwd : str
         MQTT password file.
     mqtt_username : str
         MQTT username
     use_ssl : bool
         Use SSL (mqtt-secure) if True.
+    codec : str
+        Control message codec (`json`, `fastjson`, or `msgpack`).
     connect : bool
         Connect to MQTT on initialization if True.
     bridge : bool
@@ -49,15 +70,32 @@ class Client(mqtt.Client, OrchestratorMixin, ProfileMixin):
     def __init__(
             self, cid="libsilverline", mqtt="localhost", mqtt_port=1883,
             realm="realm", pwd="mqtt_pwd.txt", mqtt_username="cli",
-            use_ssl=False, http="localhost", http_port=8000, connect=True,
-            bridge=False):
+            use_ssl=False, http="localhost", http_port=8000, http_timeout=5.,
+            http_retries=3, http_pool=16, cache_ttl=10., codec="json",
+            connect=True, bridge=False):
 
         self.callbacks = {}
+        self.router = TopicRouter()
+        self._batch = None
+        self._suback = Condition()
+        self._subacked = {}
+        self._completions = None
+        self.codec = get_codec(codec)
+        self.pending = weakref.WeakValueDictionary()
+        self._pending_lock = Lock()
+        self._control_subscribed = False
         self.arts_api = "http://{}:{}/api".format(http, http_port)
+        self.rest = RestSession(
+            self.arts_api, timeout=http_timeout, retries=http_retries,
+            pool=http_pool)
+        self.runtime_registry = Registry(self.get_runtimes, ttl=cache_ttl)
+        self.module_registry = Registry(self.get_modules, ttl=cache_ttl)
         self.realm = realm
         self.mqtt_control = "/".join([realm, "proc", "control"])
 
         self.log = logging.getLogger('client')
+        self.errors = ErrorLimiter(self.log)
+        self._init_metrics()
 
         # Append a UUID here since client_id must be unique.
         # If this is not added, MQTT will disconnect with rc=7
@@ -67,47 +105,303 @@ class Client(mqtt.Client, OrchestratorMixin, ProfileMixin):
         if bridge:
             self.enable_bridge_mode()
 
+        self.semaphore = None
         if connect:
             self.semaphore = Semaphore()
             self.semaphore.acquire()
 
-            self.log.info("Connecting with MQTT client: {}".format(cid))
-            self.log.info("SSL: {}".format(use_ssl))
-            self.log.info("Username: {}".format(mqtt_username))
-            try:
-                with open(pwd, 'r') as f:
-                    passwd = f.read().rstrip('\n')
-                self.log.info("Password file: {}".format(pwd))
-            except FileNotFoundError:
-                passwd = ""
-                self.log.warn("No password supplied; using an empty password.")
-
-            self.username_pw_set(mqtt_username, passwd)
-            if use_ssl:
-                self.tls_set(cert_reqs=ssl.CERT_NONE)
+            self.log.info("Connecting with MQTT client: %s", cid)
+            self.login(pwd=pwd, mqtt_username=mqtt_username, use_ssl=use_ssl)
             self.connect(mqtt, mqtt_port, 60)
 
             # Waiting for on_connect to release
             self.loop_start()
             self.semaphore.acquire()
 
+    def _init_metrics(self):
+        self.stats = Metrics()
+        self._m_published = self.stats.counter("mqtt_published_total")
+        self._m_published_bytes = self.stats.counter(
+            "mqtt_published_bytes_total")
+        self._m_received = self.stats.counter("mqtt_received_total")
+        self._m_received_bytes = self.stats.counter(
+            "mqtt_received_bytes_total")
+        self._m_unhandled = self.stats.counter("mqtt_unhandled_total")
+        self._m_connects = self.stats.counter("mqtt_connects_total")
+        self._m_reconnects = self.stats.counter("mqtt_reconnects_total")
+        self._m_disconnects = self.stats.counter("mqtt_disconnects_total")
+        self.stats.gauge(
+            "mqtt_out_messages", lambda: len(self._out_messages))
+        self.stats.gauge("mqtt_inflight", lambda: self._inflight_messages)
+        self.stats.gauge("mqtt_subscriptions", lambda: len(self.router))
+
+    def metrics(self):
+        """Get snapshot of client metrics; see `Metrics.snapshot`.
+
+        Includes publish/receive message and byte counts, connect,
+        reconnect, and disconnect counts, paho's outgoing queue depth
+        (`mqtt_out_messages`) and QoS>0 in-flight count (`mqtt_inflight`),
+        per-topic callback latency (`callback_seconds`), handler errors, and
+        profiler round-trip latency.
+        """
+        return self.stats.snapshot()
+
+    def login(self, pwd="mqtt_pwd.txt", mqtt_username="cli", use_ssl=False):
+        """Set MQTT credentials and SSL before connecting."""
+        self.log.info("SSL: %s", use_ssl)
+        self.log.info("Username: %s", mqtt_username)
+        try:
+            with open(pwd, 'r') as f:
+                passwd = f.read().rstrip('\n')
+            self.log.info("Password file: %s", pwd)
+        except FileNotFoundError:
+            passwd = ""
+            self.log.warn("No password supplied; using an empty password.")
+
+        self.username_pw_set(mqtt_username, passwd)
+        if use_ssl:
+            self.tls_set(cert_reqs=ssl.CERT_NONE)
+
     def on_connect(self, mqttc, obj, flags, rc):
         """On connect callback: register handlers, release main thread."""
+        if self._m_connects.value > 0:
+            self._m_reconnects.inc()
+        self._m_connects.inc()
         if self.semaphore is not None:
             self.semaphore.release()
         self.log.info("Connected to MQTT server.")
 
     def on_disconnect(self, client, userdata, rc):
         """Disconnection callback."""
-        self.log.warn("Disconnected: rc={} ({})".format(
-            rc, mqtt.connack_string(rc)))
+        self._m_disconnects.inc()
+        self.log.warning(
+            "Disconnected: rc=%s (%s)", rc, mqtt.connack_string(rc))
+
+    def publish(self, topic, payload=None, qos=0, retain=False,
+                properties=None):
+        """Publish a message."""
+        self._m_published.inc()
+        if payload is not None:
+            self._m_published_bytes.inc(len(payload))
+        return super().publish(
+            topic, payload=payload, qos=qos, retain=retain,
+            properties=properties)
+
+    def publish_pipelined(
+            self, messages, inflight=64, timeout=30., on_publish=None,
+            on_complete=None):
+        """Publish messages with a bounded number of QoS handshakes in flight.
+
+        Publishes are issued back-to-back; once `inflight` messages are
+        outstanding, waits for the oldest to complete before sending more.
+        Returns only once every publish has completed.
+
+        Parameters
+        ----------
+        messages : iterable of (str, bytes or str, int)
+            (topic, payload, qos) tuples to publish.
+        inflight : int
+            Maximum number of incomplete publishes. Also sets the paho
+            in-flight limit to match, for the duration of this call.
+        timeout : float
+            Total time budget for all publishes, in seconds.
+        on_publish : callable
+            If passed, called as `on_publish(index, info)` right after each
+            message is handed to paho.
+        on_complete : callable
+            If passed, called as `on_complete(index, info, completed)` for
+            each message (in order) once its publish has completed or
+            failed. `completed` is the `time.perf_counter()` timestamp at
+            which that publish completed, even if earlier messages completed
+            later; failed publishes have `info.is_published()` False, and
+            `completed` None.
+
+        Returns
+        -------
+        float
+            Elapsed time until the last publish completed, in seconds.
+
+        Raises
+        ------
+        TimeoutError
+            If any publish failed or did not complete within `timeout`.
+        """
+        start = time.perf_counter()
+        deadline = start + timeout
+        previous = self._max_inflight_messages
+        self.max_inflight_messages_set(inflight)
+        outer = self._completions
+        self._completions = completions = {}
+
+        window = deque()
+        failed = []
+
+        def _wait(i, info):
+            info.wait_for_publish(max(0., deadline - time.perf_counter()))
+            completed = completions.pop(info.mid, None)
+            if not info.is_published():
+                failed.append(info)
+                completed = None
+            elif completed is None:
+                # `on_publish` was overridden; fall back to the time we saw it
+                completed = time.perf_counter()
+            if on_complete is not None:
+                on_complete(i, info, completed)
+
+        try:
+            for i, (topic, payload, qos) in enumerate(messages):
+                if len(window) >= inflight:
+                    _wait(*window.popleft())
+                info = self.publish(topic, payload, qos=qos)
+                if on_publish is not None:
+                    on_publish(i, info)
+                if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                    failed.append(info)
+                    if on_complete is not None:
+                        on_complete(i, info, None)
+                else:
+                    window.append((i, info))
+            while window:
+                _wait(*window.popleft())
+        finally:
+            self.max_inflight_messages_set(previous)
+            self._completions = outer
+
+        if failed:
+            raise TimeoutError(
+                "{} publishes did not complete within {}s.".format(
+                    len(failed), timeout))
+        return time.perf_counter() - start
+
+    def on_publish(self, client, userdata, mid):
+        """Publish callback: record completion time during pipelining."""
+        completions = self._completions
+        if completions is not None:
+            completions[mid] = time.perf_counter()
+
+    def on_subscribe(self, client, userdata, mid, granted_qos):
+        """Subscribe callback: record SUBACK and granted QoS."""
+        if 0x80 in granted_qos:
+            self.log.warning(
+                "Broker refused %d subscription(s) in SUBSCRIBE %d.",
+                list(granted_qos).count(0x80), mid)
+        with self._suback:
+            self._subacked[mid] = granted_qos
+            self._suback.notify_all()
+
+    def subscribe_many(self, topics, qos=0, chunk=256, timeout=10.):
+        """Subscribe to many topics, and wait until all are acknowledged.
+
+        Parameters
+        ----------
+        topics : str[]
+            Topic filters to subscribe to.
+        qos : int
+            Subscription QoS.
+        chunk : int
+            Maximum number of topic filters in each SUBSCRIBE packet.
+        timeout : float
+            Time limit for receiving all SUBACKs, in seconds.
+
+        Returns
+        -------
+        float
+            Time taken until all subscriptions were acknowledged, in seconds.
+
+        Raises
+        ------
+        TimeoutError
+            If not all subscriptions were acknowledged within `timeout`.
+        RuntimeError
+            If the broker refused any subscription (granted QoS 0x80).
+        """
+        start = time.perf_counter()
+        mids = {}
+        with self._suback:
+            for i in range(0, len(topics), chunk):
+                batch = topics[i:i + chunk]
+                rc, mid = self.subscribe([(t, qos) for t in batch])
+                if rc != mqtt.MQTT_ERR_SUCCESS:
+                    self.log.warning(
+                        "Subscribe failed: %s", mqtt.error_string(rc))
+                    continue
+                # Message IDs wrap around; drop any stale SUBACK for this ID.
+                self._subacked.pop(mid, None)
+                mids[mid] = batch
+
+            deadline = start + timeout
+            while not mids.keys() <= self._subacked.keys():
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        "{} / {} SUBSCRIBE packets were not acknowledged "
+                        "within {}s.".format(
+                            len(mids.keys() - self._subacked.keys()),
+                            len(mids), timeout))
+                self._suback.wait(remaining)
+            refused = [
+                t for mid, batch in mids.items()
+                for t, granted in zip(batch, self._subacked.pop(mid))
+                if granted == 0x80]
+
+        if refused:
+            self.log.error("Subscriptions refused: %s", refused)
+            raise RuntimeError(
+                "Broker refused {} / {} subscriptions: {}".format(
+                    len(refused), len(topics), refused[:8]))
+        return time.perf_counter() - start
+
+    @contextmanager
+    def subscription_batch(self, chunk=256, timeout=10.):
+        """Batch subscriptions made by `register_callback`.
+
+        Within this context, `register_callback` only registers callbacks;
+        on exit, all topics are subscribed to at once with `subscribe_many`,
+        which blocks until the broker has acknowledged every subscription.
+        The yielded dict holds the batched `topics` and, on exit, the
+        subscription phase duration `elapsed` (seconds).
+        """
+        batch = {"topics": [], "elapsed": 0.}
+        self._batch = batch["topics"]
+        try:
+            yield batch
+        finally:
+            self._batch = None
+        if batch["topics"]:
+            batch["elapsed"] = self.subscribe_many(
+                batch["topics"], chunk=chunk, timeout=timeout)
+            self.log.info(
+                "Subscribed to %d topics in %.3fs.", len(batch["topics"]),
+                batch["elapsed"])
 
     def register_callback(self, topic, callback):
-        """Subscribe to topic and register callback for that topic."""
-        self.subscribe(topic)
-        self.message_callback_add(topic, callback)
+        """Subscribe to topic and register callback for that topic.
+
+        Callback latency is recorded in the `callback_seconds` histogram for
+        this topic filter.
+        """
+        if self._batch is not None:
+            self._batch.append(topic)
+        else:
+            self.subscribe(topic)
+
+        hist = self.stats.histogram("callback_seconds", topic=topic)
 
-    def register_handler(self, handler, catch=True):
+        def _timed(client, userdata, msg):
+            start = time.perf_counter()
+            try:
+                callback(client, userdata, msg)
+            finally:
+                hist.observe(time.perf_counter() - start)
+
+        self.router.add(topic, _timed)
+
+    def unregister_callback(self, topic):
+        """Unsubscribe from topic and remove its callback."""
+        if self.router.remove(topic):
+            self.unsubscribe(topic)
+
+    def register_handler(self, handler, catch=True, dispatcher=None):
         """Subscribe and register callback for handler.
 
         Parameters
@@ -115,22 +409,46 @@ class Client(mqtt.Client, OrchestratorMixin, ProfileMixin):
         handler : BaseHandler
             Message handler to register.
         catch : bool
-            If True, catches and logs errors; otherwise, raises like usual.
+            If True, catches and logs errors (repeats of the same exception
+            type on a topic are rate-limited; see `ErrorLimiter`);
+            otherwise, raises like usual.
+        dispatcher : Dispatcher
+            If passed, decodes and handles messages on the dispatcher's
+            worker threads instead of the MQTT network thread. Errors are
+            always caught, and logged by the dispatcher's `ErrorLimiter`
+            if not already caught here.
         """
+        errors = self.stats.counter(
+            "handler_errors_total", topic=handler.topic)
+
         def _handle(client, userdata, msg, handler=handler):
             try:
                 handler.handle(handler.decode(client, userdata, msg))
             except Exception as e:
+                errors.inc()
                 if catch:
-                    self.log.error("{} @ {}: {}".format(
-                        str(e), msg.topic, msg.payload[:64]))
-                    self.log.error(traceback.format_exc())
+                    self.errors.error(
+                        (handler.topic, type(e)), "%s @ %s: %s", e,
+                        msg.topic, msg.payload[:64], exc_info=True)
                 else:
                     raise(e)
-        self.register_callback(handler.topic, _handle)
+
+        if dispatcher is None:
+            self.register_callback(handler.topic, _handle)
+        else:
+            def _submit(client, userdata, msg):
+                dispatcher.submit(msg.topic, _handle, client, userdata, msg)
+            self.register_callback(handler.topic, _submit)
 
     def on_message(self, client, userdata, message):
-        """Subscribed message handler."""
-        self.log.warn(
-            "Message arrived topic without handler (should be "
-            "impossible!): {}".format(message.topic))
+        """Subscribed message handler; dispatches to registered callbacks."""
+        self._m_received.inc()
+        self._m_received_bytes.inc(len(message.payload))
+        callbacks = self.router.match(message.topic)
+        if not callbacks:
+            self._m_unhandled.inc()
+            self.log.warning(
+                "Message arrived topic without handler (should be "
+                "impossible!): %s", message.topic)
+        for callback in callbacks:
+            callback(client, userdata, message)
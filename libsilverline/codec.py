@@ -0,0 +1,110 @@
+"""Message payload codecs."""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class JSONCodec:
+    """Standard library JSON codec.
+
+    Payloads wrapped in single quotes (`'{...}'`) are unwrapped before
+    decoding; invalid UTF-8 is ignored.
+    """
+
+    name = "json"
+
+    def encode(self, obj):
+        """Encode object."""
+        return json.dumps(obj)
+
+    def decode(self, payload):
+        """Decode message payload (bytes)."""
+        payload = str(payload.decode("utf-8", "ignore"))
+        if (payload[0] == "'"):
+            payload = payload[1:len(payload) - 1]
+        return json.loads(payload)
+
+
+class FastJSONCodec:
+    """JSON codec using `orjson` (optional dependency).
+
+    Decodes directly from the payload buffer; single-quote unwrapping uses a
+    `memoryview`, so no copies are made.
+    """
+
+    name = "fastjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("The `fastjson` codec requires `orjson`.")
+
+    def encode(self, obj):
+        """Encode object."""
+        return orjson.dumps(obj)
+
+    def decode(self, payload):
+        """Decode message payload (bytes)."""
+        view = memoryview(payload)
+        if view[:1] == b"'":
+            view = view[1:-1]
+        return orjson.loads(view)
+
+
+class MsgpackCodec:
+    """MessagePack codec (optional dependency `msgpack`)."""
+
+    name = "msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("The `msgpack` codec requires `msgpack`.")
+
+    def encode(self, obj):
+        """Encode object."""
+        return msgpack.packb(obj)
+
+    def decode(self, payload):
+        """Decode message payload (bytes)."""
+        return msgpack.unpackb(payload)
+
+
+class RawCodec:
+    """Pass-through codec; decodes payloads to a `memoryview`."""
+
+    name = "raw"
+
+    def encode(self, obj):
+        """Encode object; must already be `bytes`-like or `str`."""
+        if not isinstance(obj, (bytes, bytearray, memoryview, str)):
+            raise TypeError(
+                "The `raw` codec can't encode {}.".format(type(obj)))
+        return obj
+
+    def decode(self, payload):
+        """Decode message payload (bytes)."""
+        return memoryview(payload)
+
+
+CODECS = {
+    c.name: c for c in [JSONCodec, FastJSONCodec, MsgpackCodec, RawCodec]}
+
+
+def get_codec(codec):
+    """Get codec by name (`json`, `fastjson`, `msgpack`, `raw`).
+
+    Codec instances are passed through unchanged.
+    """
+    if not isinstance(codec, str):
+        return codec
+    if codec not in CODECS:
+        raise ValueError("Invalid codec: {}".format(codec))
+    return CODECS[codec]()
@@ -0,0 +1,152 @@
+"""Control message request/response correlation for SilverLine Client."""
+
+import time
+import uuid
+from concurrent.futures import Future, InvalidStateError, wait
+
+
+class ControlRequest(Future):
+    """Pending control request; resolves to the orchestrator's response.
+
+    Parameters
+    ----------
+    object_id : str
+        Request ID; the matching response carries the same `object_id`.
+    uuid : str
+        Target of the request (runtime or module UUID), if any.
+
+    Attributes
+    ----------
+    sent : float
+        `time.perf_counter()` timestamp when the request was published.
+    received : float
+        `time.perf_counter()` timestamp when the response arrived.
+    info : paho.mqtt.client.MQTTMessageInfo
+        Publish handle for the request.
+    """
+
+    def __init__(self, object_id, uuid=None):
+        super().__init__()
+        self.object_id = object_id
+        self.uuid = uuid
+        self.sent = None
+        self.received = None
+        self.info = None
+
+    @property
+    def latency(self):
+        """Round-trip latency in seconds; `None` until a response arrives."""
+        if self.sent is None or self.received is None:
+            return None
+        return self.received - self.sent
+
+
+class ControlMixin:
+    """Request/response correlation mixins.
+
+    Responses are matched to requests using the `object_id` of each message
+    in the control topics; pending requests are indexed by `object_id`
+    until their response arrives, they are cancelled or time out (see
+    `wait_requests`), or they are no longer referenced (the index holds
+    weak references, so requests nobody waits on are not kept alive).
+    Create/delete messages also invalidate the runtime and module
+    registries.
+    """
+
+    def _control_topics(self):
+        return [
+            "{}/#".format(self.mqtt_control),
+            "{}/proc/profile/control".format(self.realm)]
+
+    def _subscribe_responses(self):
+        """Subscribe to response topics (only once)."""
+        with self._pending_lock:
+            if self._control_subscribed:
+                return
+            self._control_subscribed = True
+        for topic in self._control_topics():
+            self.register_callback(topic, self._on_control)
+
+    def _on_control(self, client, userdata, msg):
+        """Resolve pending request matching a control response."""
+        try:
+            resp = self.codec.decode(msg.payload)
+        except Exception:
+            return
+        if not isinstance(resp, dict):
+            return
+        if resp.get("action") in {"create", "delete"}:
+            self.runtime_registry.invalidate()
+            self.module_registry.invalidate()
+        if resp.get("type") != "resp":
+            return
+
+        with self._pending_lock:
+            req = self.pending.pop(resp.get("object_id"), None)
+        if req is None:
+            return
+        # Not under the lock, since done callbacks may issue new requests; a
+        # concurrent `cancel_request` can still win the race.
+        req.received = time.perf_counter()
+        try:
+            req.set_result(resp)
+        except InvalidStateError:
+            pass
+
+    def _control_message(self, topic, message, target=None, qos=2):
+        """Register a pending request for a control message.
+
+        Returns
+        -------
+        (ControlRequest, (str, str, int))
+            Pending request, and (topic, payload, qos) to publish.
+        """
+        req = ControlRequest(str(uuid.uuid4()), uuid=target)
+        with self._pending_lock:
+            self.pending[req.object_id] = req
+        self._subscribe_responses()
+        payload = self.codec.encode({"object_id": req.object_id, **message})
+        return req, (topic, payload, qos)
+
+    def _published(self, req, info):
+        """Record that a request was just published; returns the request."""
+        req.sent = time.perf_counter()
+        req.info = info
+        return req
+
+    def _request(self, topic, message, target=None, qos=2):
+        """Publish control message, and return the pending request."""
+        req, (topic, payload, qos) = self._control_message(
+            topic, message, target=target, qos=qos)
+        return self._published(req, self.publish(topic, payload, qos=qos))
+
+    def cancel_request(self, req):
+        """Cancel pending request and drop it from the pending index."""
+        with self._pending_lock:
+            self.pending.pop(req.object_id, None)
+            req.cancel()
+
+    def wait_requests(self, requests, timeout=None):
+        """Wait for responses to control requests.
+
+        Requests which have not received a response by `timeout` are
+        cancelled and dropped from the pending index.
+
+        Parameters
+        ----------
+        requests : ControlRequest[]
+            Requests to wait for.
+        timeout : float
+            Time limit in seconds; waits indefinitely if `None`.
+
+        Returns
+        -------
+        (ControlRequest[], ControlRequest[])
+            Completed requests, and requests which timed out.
+        """
+        done, not_done = wait(requests, timeout=timeout)
+        for req in not_done:
+            self.cancel_request(req)
+        return (
+            [r for r in requests if r in done],
+            [r for r in requests if r in not_done])
@@ -1,41 +1,230 @@
 """Benchmark data generation schemes."""
 
 import os
+import mmap
+import random
 import numpy as np
 
 
+class FenwickTree:
+    """Fenwick (binary indexed) tree over a growable list of weights.
+
+    Supports O(log n) point updates and O(log n) sampling of an index
+    with probability proportional to its weight.
+
+    Parameters
+    ----------
+    capacity : int
+        Initial capacity; doubles whenever it is exceeded.
+    """
+
+    def __init__(self, capacity=16):
+        self.weights = []
+        self.total = 0.
+        self._tree = [0.] * (capacity + 1)
+
+    def __len__(self):
+        return len(self.weights)
+
+    def _grow(self):
+        # Linear-time rebuild at double capacity.
+        tree = [0.] * (2 * (len(self._tree) - 1) + 1)
+        tree[1:len(self.weights) + 1] = self.weights
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def add(self, idx, delta):
+        """Add `delta` to the weight at `idx`."""
+        self.weights[idx] += delta
+        self.total += delta
+        tree = self._tree
+        i = idx + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def append(self, weight):
+        """Append new weight."""
+        if len(self.weights) + 1 >= len(self._tree):
+            self._grow()
+        self.weights.append(0.)
+        self.add(len(self.weights) - 1, weight)
+
+    def search(self, u):
+        """Find the index `i` where `sum(weights[:i]) <= u < sum(...[:i+1])`.
+
+        `u` should be in `[0, total)`.
+        """
+        tree = self._tree
+        pos = 0
+        step = 1 << ((len(tree) - 1).bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= u:
+                pos = nxt
+                u -= tree[nxt]
+            step >>= 1
+        return min(pos, len(self.weights) - 1)
+
+
+class PayloadPool:
+    """Random payloads sliced out of a single pre-filled arena.
+
+    Instead of generating random bytes for each message, the arena is filled
+    once, and each payload is a `bytes` slice of it starting at one of
+    `entropy` fixed offsets. The required prefix is written at every offset
+    up front, so payloads need no concatenation either.
+
+    Parameters
+    ----------
+    size : int
+        Initial arena size in bytes; grows if a larger payload is requested.
+    entropy : int
+        Number of distinct payload start offsets. Lower values make payloads
+        of the same size more likely to be identical (i.e. already cached by
+        the runtime); higher values make them more likely to be distinct.
+        Must be at most `size // len(prefix)`, so that prefixes do not
+        overlap.
+    prefix : bytes
+        Prefix that each payload must start with.
+    path : str
+        If passed, memory-maps this file (copy-on-write) as the arena instead
+        of generating random data.
+    """
+
+    def __init__(self, size=1 << 24, entropy=64, prefix=b">>> ", path=None):
+        self.entropy = max(entropy, 1)
+        self.prefix = prefix
+        self.path = path
+        self._random = random.Random()
+        self._fill(size)
+
+    def _fill(self, size):
+        if self.path:
+            with open(self.path, 'rb') as f:
+                arena = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            if len(arena) < size:
+                raise ValueError(
+                    "Payload source {} is smaller than {} bytes.".format(
+                        self.path, size))
+        else:
+            arena = bytearray(os.urandom(size))
+
+        self.stride = max(len(arena) // self.entropy, 1)
+        if self.stride < len(self.prefix):
+            raise ValueError(
+                "{} payload offsets do not fit in a {} byte arena with a {} "
+                "byte prefix.".format(
+                    self.entropy, len(arena), len(self.prefix)))
+        for offset in range(0, len(arena) - len(self.prefix) + 1, self.stride):
+            arena[offset:offset + len(self.prefix)] = self.prefix
+        # Slicing `bytes` (or `mmap`) yields `bytes`, which paho publishes
+        # as-is.
+        self.arena = arena if self.path else bytes(arena)
+
+    def get(self, size):
+        """Get payload of `size` bytes (including the prefix)."""
+        if size > len(self.arena):
+            self._fill(max(2 * len(self.arena), size))
+        start = self.stride * self._random.randint(
+            0, (len(self.arena) - size) // self.stride)
+        return self.arena[start:start + size]
+
+
 class DirichletProcess:
     """Dirichlet Process.
 
+    Table counts are kept in a `FenwickTree`, so each draw costs
+    O(log #tables).
+
     Parameters
     ----------
     prior
         Distribution for each dirichlet process cluster.
     alpha : float
         Dirichlet process new table probability.
+    batch : int
+        If >1, `generate` draws sizes in batches of this many (via
+        `draw_many`) instead of one at a time.
+    pool : PayloadPool
+        If passed, `generate` returns slices of this pool instead of fresh
+        random buffers.
     """
 
-    def __init__(self, prior, alpha=1.):
-        self.tables = []
+    def __init__(self, prior, alpha=1., batch=1, pool=None):
+        self.counts = FenwickTree()
         self.values = []
 
         self.prior = prior
         self.alpha = alpha
 
-    def draw(self):
-        """Sample from DP and update hidden state."""
-        weights = [self.alpha] + self.tables
-        weights = np.array(weights) / np.sum(weights)
-        idx = np.random.choice(len(weights), 1, p=weights)[0]
-        if idx == 0:
-            self.tables.append(1)
+        self.batch = batch
+        self._buffer = []
+        self.pool = pool
+
+    @property
+    def tables(self):
+        """Number of draws assigned to each table."""
+        return [int(w) for w in self.counts.weights]
+
+    def _draw(self, u):
+        """Draw using uniform sample `u` in [0, 1)."""
+        u = u * (self.alpha + self.counts.total)
+        if u < self.alpha or len(self.counts) == 0:
+            self.counts.append(1)
             self.values.append(self.prior())
             return self.values[-1]
         else:
-            self.tables[idx - 1] += 1
-            return self.values[idx - 1]
+            idx = self.counts.search(u - self.alpha)
+            self.counts.add(idx, 1)
+            return self.values[idx]
+
+    def draw(self):
+        """Sample from DP and update hidden state."""
+        return self._draw(np.random.random())
+
+    def draw_many(self, k):
+        """Draw `k` samples (updating state after each); returns an array.
+
+        The uniform samples, the total weight before each draw (which grows
+        by one per draw), and hence which draws open a new table, are
+        computed in one pass with NumPy. The Fenwick searches for the other
+        draws still run one at a time, since each depends on the counts
+        updated by the draws before it.
+        """
+        u = np.random.random(k) * (
+            self.alpha + self.counts.total + np.arange(k))
+        new = u < self.alpha
+        if len(self.counts) == 0 and k > 0:
+            new[0] = True
+
+        counts, values = self.counts, self.values
+        res = []
+        for v, is_new in zip((u - self.alpha).tolist(), new.tolist()):
+            if is_new:
+                counts.append(1)
+                values.append(self.prior())
+                res.append(values[-1])
+            else:
+                idx = counts.search(v)
+                counts.add(idx, 1)
+                res.append(values[idx])
+        return np.array(res)
 
     def generate(self, min_size=4):
-        """Generate random buffer with size drawn from this DP."""
-        size = self.draw() + min_size
+        """Generate random buffer with size drawn from this DP.
+
+        Returns `bytes`, sliced out of this DP's `PayloadPool` if it has one.
+        """
+        if self.batch > 1:
+            if not self._buffer:
+                self._buffer = list(self.draw_many(self.batch)[::-1])
+            size = self._buffer.pop() + min_size
+        else:
+            size = self.draw() + min_size
+        if self.pool is not None:
+            return self.pool.get(size)
         return b">>> " + os.urandom(size - 4)
@@ -0,0 +1,155 @@
+"""Handler dispatch pool."""
+
+import time
+import logging
+import threading
+from collections import deque
+
+from .logging import ErrorLimiter
+
+
+class _Worker:
+    """Worker thread with a bounded queue."""
+
+    def __init__(self, name, maxsize, overflow, errors):
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.errors = errors
+
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.stopped = False
+
+        self.max_depth = 0
+        self.dropped = 0
+        self.handled = 0
+        self.busy = 0.
+        self.wait = 0.
+        self.max_latency = 0.
+
+        self.thread = threading.Thread(
+            target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def put(self, item):
+        with self.cond:
+            if self.stopped:
+                self.dropped += 1
+                return
+            if len(self.queue) >= self.maxsize:
+                if self.overflow == "drop-newest":
+                    self.dropped += 1
+                    return
+                elif self.overflow == "drop-oldest":
+                    self.queue.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self.queue) >= self.maxsize:
+                        self.cond.wait()
+                        # `stop` releases blocked producers
+                        if self.stopped:
+                            self.dropped += 1
+                            return
+            self.queue.append(item)
+            self.max_depth = max(self.max_depth, len(self.queue))
+            self.cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self.stopped:
+                    self.cond.wait()
+                if not self.queue:
+                    return
+                queued, topic, func, args = self.queue.popleft()
+                self.cond.notify_all()
+
+            start = time.perf_counter()
+            try:
+                func(*args)
+            except Exception as e:
+                self.errors.error(
+                    (topic, type(e)), "Handler failed: %s @ %s", e, topic,
+                    exc_info=True)
+            end = time.perf_counter()
+
+            self.handled += 1
+            self.wait += start - queued
+            self.busy += end - start
+            self.max_latency = max(self.max_latency, end - start)
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+        self.thread.join()
+
+
+class Dispatcher:
+    """Dispatch handler work from the MQTT network thread to worker threads.
+
+    Messages are sharded onto workers by topic, and each worker handles its
+    messages in order, so messages on the same topic are always handled in
+    the order they arrived. Each worker has a bounded queue; when it is full,
+    the overflow policy applies:
+
+      - `block`: wait for space (i.e. pause the network thread).
+      - `drop-oldest`: discard the oldest queued message.
+      - `drop-newest`: discard the incoming message.
+
+    Handler errors are logged through an `ErrorLimiter` (`errors`), keyed on
+    topic and exception type. Messages submitted after (or blocked during)
+    `stop` are dropped.
+
+    Parameters
+    ----------
+    workers : int
+        Number of worker threads.
+    maxsize : int
+        Maximum number of queued messages per worker.
+    overflow : str
+        Overflow policy: `block`, `drop-oldest`, or `drop-newest`.
+    """
+
+    def __init__(self, workers=4, maxsize=1024, overflow="block"):
+        if overflow not in {"block", "drop-oldest", "drop-newest"}:
+            raise ValueError("Invalid overflow policy: {}".format(overflow))
+
+        self.log = logging.getLogger('dispatch')
+        self.errors = ErrorLimiter(self.log)
+        self.workers = [
+            _Worker("dispatch-{}".format(i), maxsize, overflow, self.errors)
+            for i in range(workers)]
+
+    def submit(self, topic, func, *args):
+        """Queue `func(*args)` on the worker responsible for `topic`."""
+        worker = self.workers[hash(topic) % len(self.workers)]
+        worker.put((time.perf_counter(), topic, func, args))
+
+    def stats(self):
+        """Get queue and handler statistics.
+
+        Returns
+        -------
+        dict
+            `depth` (current queue depth of each worker), `max_depth`
+            (maximum queue depth of each worker), `handled` and `dropped`
+            (total messages), and `wait`, `latency` (mean queueing and
+            handler time in seconds) and `max_latency` (maximum handler
+            time in seconds).
+        """
+        handled = sum(w.handled for w in self.workers)
+        return {
+            "depth": [len(w.queue) for w in self.workers],
+            "max_depth": [w.max_depth for w in self.workers],
+            "handled": handled,
+            "dropped": sum(w.dropped for w in self.workers),
+            "wait": sum(w.wait for w in self.workers) / max(handled, 1),
+            "latency": sum(w.busy for w in self.workers) / max(handled, 1),
+            "max_latency": max(w.max_latency for w in self.workers)
+        }
+
+    def stop(self):
+        """Handle remaining queued messages, then stop worker threads."""
+        for w in self.workers:
+            w.stop()
@@ -1,6 +1,6 @@
 """Base message handler class for reference."""
 
-import json
+from .codec import JSONCodec
 
 
 class BaseHandler:
@@ -16,17 +16,19 @@ class BaseHandler:
         Handles data type returned by `decode`.
     topic : str
         Topic that this handler corresponds to.
+    codec : object
+        Codec used by the default `decode` (see `libsilverline.codec`; use
+        `get_codec` to select one by name).
     """
 
+    codec = JSONCodec()
+
     def __init__(self):
         self.topic = None
 
     def decode(self, client, userdata, msg):
-        """Decode generic JSON message."""
-        payload = str(msg.payload.decode("utf-8", "ignore"))
-        if (payload[0] == "'"):
-            payload = payload[1:len(payload) - 1]
-        return json.loads(payload)
+        """Decode message using this handler's codec (JSON by default)."""
+        return self.codec.decode(msg.payload)
 
     def handle(self, _):
         """Message handler.
@@ -0,0 +1,60 @@
+"""Round-trip latency sample collection."""
+
+import numpy as np
+
+
+class LatencyBuffer:
+    """Growable, preallocated buffer of latency samples (in nanoseconds).
+
+    Samples are written into a preallocated int64 array, which doubles in
+    size whenever it fills up.
+
+    Parameters
+    ----------
+    capacity : int
+        Initial number of samples to allocate.
+    """
+
+    def __init__(self, capacity=1024):
+        self._data = np.empty(max(capacity, 1), dtype=np.int64)
+        self.size = 0
+
+    def append(self, sample):
+        """Add sample."""
+        if self.size >= self._data.shape[0]:
+            grown = np.empty(self._data.shape[0] * 2, dtype=np.int64)
+            grown[:self.size] = self._data
+            self._data = grown
+        self._data[self.size] = sample
+        self.size += 1
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def array(self):
+        """Recorded samples (a view; copy if the buffer is still in use)."""
+        return self._data[:self.size]
+
+
+def summarize(samples):
+    """Compute latency summary (p50, p90, p99, max) for samples.
+
+    Returns
+    -------
+    dict
+        Summary statistics (NaN if there are no samples), in the same units
+        as the samples.
+    """
+    if len(samples) == 0:
+        return {"n": 0, "p50": np.nan, "p90": np.nan, "p99": np.nan,
+                "max": np.nan}
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+    return {
+        "n": len(samples), "p50": p50, "p90": p90, "p99": p99,
+        "max": np.max(samples)}
+
+
+def save_npz(path, results):
+    """Save per-module latency arrays (`run_profilers` output) to `.npz`."""
+    np.savez(path, **{k: v["latency"] for k, v in results.items()})
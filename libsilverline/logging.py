@@ -1,10 +1,136 @@
 """Standardized loggging configuration."""
 
+import time
+import queue as _queue
+import atexit
 import logging
+import threading
+import weakref
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 
+from .metrics import MetricsReporter
 
-def configure_log(log="", verbose=2):
+
+_reporter = None
+_listener = None
+_limiters = weakref.WeakSet()
+
+
+class ErrorLimiter:
+    """Rate-limit and aggregate repeated errors.
+
+    Errors are identified by a key (e.g. topic and exception type). The
+    first occurrence of each error is logged (with traceback, if
+    `exc_info`); repeats are only counted, and logged as a single summary
+    line (with the most recent message) at most once every `interval`
+    seconds. Counts left over when errors stop are reported when a later
+    error (of any key) arrives at least `interval` seconds after the last
+    sweep, or by `flush` (which also runs at exit); there is no timer
+    thread, so a quiet limiter reports nothing until then.
+
+    At most `maxsize` keys are tracked; the least recently seen key is
+    flushed and dropped to make room for a new one.
+
+    Parameters
+    ----------
+    log : logging.Logger
+        Logger to write to.
+    interval : float
+        Minimum time between log lines for the same error, in seconds.
+    maxsize : int
+        Maximum number of distinct errors to track.
+    """
+
+    def __init__(self, log, interval=10., maxsize=256):
+        self.log = log
+        self.interval = interval
+        self.maxsize = maxsize
+        # key -> [window start, repeats, last msg, last args]
+        self._errors = OrderedDict()
+        self._sweep = time.monotonic() + interval
+        self._lock = threading.Lock()
+        _limiters.add(self)
+
+    def _summary(self, state, now):
+        self.log.error(
+            state[2] + " (repeated %d times in %.1fs)", *state[3], state[1],
+            now - state[0])
+
+    def _expire(self, now):
+        """Collect repeats from expired windows; drop quiet errors."""
+        pending = []
+        for key, state in list(self._errors.items()):
+            if now - state[0] >= self.interval:
+                if state[1]:
+                    pending.append(list(state))
+                    self._errors[key] = [now, 0, state[2], state[3]]
+                else:
+                    del self._errors[key]
+        self._sweep = now + self.interval
+        return pending
+
+    def error(self, key, msg, *args, exc_info=False):
+        """Log error identified by `key` (hashable), unless rate-limited.
+
+        `msg` and `args` are formatted lazily, as in `Logger.error`.
+        """
+        now = time.monotonic()
+        pending = []
+        with self._lock:
+            state = self._errors.get(key)
+            if state is not None and now - state[0] < self.interval:
+                state[1] += 1
+                state[2], state[3] = msg, args
+                self._errors.move_to_end(key)
+                first = None
+            else:
+                first = state is None
+                if not first:
+                    pending.append([state[0], state[1] + 1, msg, args])
+                self._errors[key] = [now, 0, msg, args]
+                self._errors.move_to_end(key)
+                while len(self._errors) > self.maxsize:
+                    _, old = self._errors.popitem(last=False)
+                    if old[1]:
+                        pending.append(old)
+            if now >= self._sweep:
+                pending.extend(self._expire(now))
+
+        for state in pending:
+            self._summary(state, now)
+        if first:
+            self.log.error(msg, *args, exc_info=exc_info)
+
+    def flush(self):
+        """Log summary lines for all repeats not yet reported."""
+        now = time.monotonic()
+        with self._lock:
+            pending = [list(s) for s in self._errors.values() if s[1]]
+            for state in self._errors.values():
+                state[1] = 0
+        for state in pending:
+            self._summary(state, now)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue handler which leaves all formatting to the listener thread."""
+
+    def prepare(self, record):
+        return record
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_log(
+        log="", verbose=2, queue=False, metrics=0., metrics_file="",
+        force=False):
     """Configure SilverLine logging.
 
     Uses the same convention as the linux runtime:
@@ -21,19 +147,63 @@ def configure_log(log="", verbose=2):
         File to save log to. Will save to `{log}-{date}.log`.
     verbose : int or str
         Logging level to use (0-5; 5 is most verbose).
+    queue : bool
+        If True, log records are passed through a queue to a background
+        thread which formats and writes them, so that logging calls (e.g. in
+        MQTT callbacks) never wait on formatting, console, or disk I/O.
+        Message arguments are formatted later, so they should not be
+        mutated after logging.
+    metrics : float
+        If > 0, logs a summary of all client metrics (logger `metrics`, at
+        INFO) every `metrics` seconds.
+    metrics_file : str
+        If passed (and `metrics` > 0), also writes all client metrics to
+        this file in Prometheus text format at each interval.
+    force : bool
+        If True, replaces any handlers already attached to the root logger
+        (e.g. by a previous call); otherwise, like `logging.basicConfig`,
+        leaves the handlers and level alone if there are any.
     """
+    global _listener, _reporter
+
     level = {
         0: 40, 1: 30, 2: 20, 3: 10, 4: 5, 5: 0
     }.get(verbose, 0)
 
-    handlers = [logging.StreamHandler()]
-    if log:
-        handlers.append(
-            logging.FileHandler("{}{}.log".format(
-                log, datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))))
-
-    logging.basicConfig(
-        level=level,
-        format="[%(asctime)s] [%(module)s:%(levelname)s] %(message)s",
-        datefmt="%H:%M:%S",
-        handlers=handlers)
+    if force or not logging.getLogger().handlers:
+        handlers = [logging.StreamHandler()]
+        if log:
+            handlers.append(
+                logging.FileHandler("{}{}.log".format(
+                    log, datetime.now().strftime("%Y-%m-%d_%H-%M-%S"))))
+
+        formatter = logging.Formatter(
+            "[%(asctime)s] [%(module)s:%(levelname)s] %(message)s",
+            datefmt="%H:%M:%S")
+        for h in handlers:
+            h.setFormatter(formatter)
+
+        _stop_listener()
+        if queue:
+            records = _queue.SimpleQueue()
+            _listener = QueueListener(records, *handlers)
+            _listener.start()
+            handlers = [_DeferredQueueHandler(records)]
+
+        logging.basicConfig(level=level, handlers=handlers, force=force)
+
+    if _reporter is not None:
+        _reporter.stop()
+        _reporter = None
+    if metrics > 0:
+        _reporter = MetricsReporter(interval=metrics, path=metrics_file)
+
+
+def _shutdown():
+    # Report outstanding error counts before the log listener goes away.
+    for limiter in list(_limiters):
+        limiter.flush()
+    _stop_listener()
+
+
+atexit.register(_shutdown)
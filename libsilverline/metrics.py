@@ -0,0 +1,286 @@
+"""Low-overhead client metrics."""
+
+import os
+import bisect
+import logging
+import threading
+import weakref
+from threading import get_ident
+
+
+# Histogram bucket upper bounds: 1us to ~16s, doubling.
+BUCKETS = tuple(2**i * 1e-6 for i in range(25))
+
+_registries = weakref.WeakSet()
+
+
+class Counter:
+    """Monotonic counter.
+
+    Each thread increments its own cell, so increments never contend for a
+    lock; `value` sums the cells.
+    """
+
+    __slots__ = ("_cells",)
+
+    def __init__(self):
+        self._cells = {}
+
+    def inc(self, n=1):
+        """Increment counter by `n`."""
+        cell = self._cells.get(get_ident())
+        if cell is None:
+            self._cells[get_ident()] = [n]
+        else:
+            cell[0] += n
+
+    @property
+    def value(self):
+        """Current count."""
+        return sum(c[0] for c in list(self._cells.values()))
+
+
+class Histogram:
+    """Fixed-bucket histogram with per-thread cells (see `Counter`).
+
+    Parameters
+    ----------
+    buckets : float[]
+        Sorted bucket upper bounds; an implicit `+Inf` bucket is added.
+    """
+
+    __slots__ = ("buckets", "_cells")
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._cells = {}
+
+    def observe(self, value):
+        """Record one observation."""
+        cell = self._cells.get(get_ident())
+        if cell is None:
+            cell = self._cells[get_ident()] = [
+                [0] * (len(self.buckets) + 1), 0.]
+        cell[0][bisect.bisect_left(self.buckets, value)] += 1
+        cell[1] += value
+
+    def snapshot(self):
+        """Get (non-cumulative) bucket counts, sum, and count."""
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.
+        for c, s in list(self._cells.values()):
+            for i, v in enumerate(c):
+                counts[i] += v
+            total += s
+        return {"counts": counts, "sum": total, "count": sum(counts)}
+
+    def quantile(self, q, snapshot=None):
+        """Estimate quantile (upper bound of the bucket containing it)."""
+        snapshot = self.snapshot() if snapshot is None else snapshot
+        target = q * snapshot["count"]
+        seen = 0
+        for i, c in enumerate(snapshot["counts"]):
+            seen += c
+            if c and seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else \
+                    float("inf")
+        return float("nan")
+
+
+def _escape(value):
+    """Escape label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace(
+        "\n", "\\n")
+
+
+def _key(name, labels):
+    if not labels:
+        return name
+    return "{}{{{}}}".format(name, ",".join(
+        '{}="{}"'.format(k, _escape(v)) for k, v in sorted(labels.items())))
+
+
+class Metrics:
+    """Registry of named counters, histograms, and gauges.
+
+    Metrics are identified by name and labels (e.g. `topic`); getting a
+    metric which does not exist yet creates it. Callers on hot paths should
+    get metrics once and keep a reference.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        _registries.add(self)
+
+    def _get(self, table, name, labels, factory):
+        key = _key(name, labels)
+        metric = table.get(key)
+        if metric is None:
+            with self._lock:
+                metric = table.setdefault(key, factory())
+        return metric
+
+    def counter(self, name, **labels):
+        """Get counter."""
+        return self._get(self.counters, name, labels, Counter)
+
+    def histogram(self, name, **labels):
+        """Get histogram."""
+        return self._get(self.histograms, name, labels, Histogram)
+
+    def gauge(self, name, func, **labels):
+        """Register gauge, which is read by calling `func()`."""
+        self.gauges[_key(name, labels)] = func
+
+    def snapshot(self):
+        """Get current values of all metrics.
+
+        Returns
+        -------
+        dict
+            `counters` and `gauges` (values by metric key), and `histograms`
+            (with bucket `counts`, `sum`, `count`, and upper `buckets`).
+        """
+        gauges = {}
+        for k, f in list(self.gauges.items()):
+            try:
+                gauges[k] = f()
+            except Exception:
+                gauges[k] = float("nan")
+        return {
+            "counters": {
+                k: v.value for k, v in list(self.counters.items())},
+            "gauges": gauges,
+            "histograms": {
+                k: dict(buckets=v.buckets, **v.snapshot())
+                for k, v in list(self.histograms.items())}}
+
+
+def _split(key):
+    if "{" in key:
+        name, labels = key.split("{", 1)
+        return name, labels[:-1]
+    return key, ""
+
+
+def _labels(*labels):
+    labels = ",".join(x for x in labels if x)
+    return "{" + labels + "}" if labels else ""
+
+
+def prometheus(snapshot):
+    """Format metrics snapshot in the Prometheus text exposition format."""
+    lines = []
+    typed = set()
+
+    def _type(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append("# TYPE {} {}".format(name, kind))
+
+    for kind, table in [
+            ("counter", snapshot["counters"]), ("gauge", snapshot["gauges"])]:
+        for key, value in sorted(table.items()):
+            _type(_split(key)[0], kind)
+            lines.append("{} {}".format(key, value))
+
+    for key, h in sorted(snapshot["histograms"].items()):
+        name, labels = _split(key)
+        _type(name, "histogram")
+        seen = 0
+        for le, c in zip(list(h["buckets"]) + ["+Inf"], h["counts"]):
+            seen += c
+            lines.append("{}_bucket{} {}".format(
+                name, _labels(labels, 'le="{}"'.format(le)), seen))
+        lines.append("{}_sum{} {}".format(name, _labels(labels), h["sum"]))
+        lines.append("{}_count{} {}".format(
+            name, _labels(labels), h["count"]))
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path, snapshot):
+    """Write metrics snapshot to a Prometheus text file (atomically)."""
+    tmp = "{}.{}".format(path, os.getpid())
+    with open(tmp, "w") as f:
+        f.write(prometheus(snapshot))
+    os.replace(tmp, path)
+
+
+def merge(snapshots):
+    """Merge snapshots from several registries (summing values)."""
+    res = {"counters": {}, "gauges": {}, "histograms": {}}
+    for s in snapshots:
+        for kind in ["counters", "gauges"]:
+            for k, v in s[kind].items():
+                res[kind][k] = res[kind].get(k, 0) + v
+        for k, h in s["histograms"].items():
+            if k not in res["histograms"]:
+                res["histograms"][k] = dict(h, counts=list(h["counts"]))
+            else:
+                m = res["histograms"][k]
+                m["counts"] = [a + b for a, b in zip(m["counts"], h["counts"])]
+                m["sum"] += h["sum"]
+                m["count"] += h["count"]
+    return res
+
+
+def collect():
+    """Merged snapshot of all live metrics registries in this process."""
+    return merge(r.snapshot() for r in list(_registries))
+
+
+class MetricsReporter:
+    """Periodically log and/or export all metrics in this process.
+
+    Parameters
+    ----------
+    interval : float
+        Reporting interval, in seconds.
+    path : str
+        If passed, also writes Prometheus text format to this file.
+    """
+
+    def __init__(self, interval=10., path=""):
+        self.interval = interval
+        self.path = path
+        self.log = logging.getLogger("metrics")
+        self._stop = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, name="metrics", daemon=True)
+        self.thread.start()
+
+    def _summary(self, snapshot):
+        parts = ["{}={}".format(k, v) for k, v in sorted(
+            list(snapshot["counters"].items())
+            + list(snapshot["gauges"].items()))]
+        for k, h in sorted(snapshot["histograms"].items()):
+            if h["count"]:
+                hist = Histogram(h["buckets"])
+                parts.append("{}: n={} mean={:.3g}s p99<={:.3g}s".format(
+                    k, h["count"], h["sum"] / h["count"],
+                    hist.quantile(0.99, h)))
+        return "; ".join(parts)
+
+    def report(self):
+        """Log and export metrics now."""
+        snapshot = collect()
+        if self.log.isEnabledFor(logging.INFO):
+            self.log.info(self._summary(snapshot))
+        if self.path:
+            try:
+                write_prometheus(self.path, snapshot)
+            except OSError as e:
+                self.log.error("Could not write metrics: {}".format(e))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def stop(self):
+        """Stop reporting (after a final report)."""
+        self._stop.set()
+        self.thread.join()
+        self.report()
@@ -1,17 +1,19 @@
 """Orchestrator mixins for SilverLine Client."""
 
-import json
+import time
 import uuid
-import requests
+
+
+# Default sched_deadline period, in nanoseconds.
+_PERIOD = 10000000
 
 
 class OrchestratorMixin:
     """Orchestrator API mixins."""
 
-    def delete_runtime(self, target, name="test"):
-        """Instruct runtime to exit."""
-        payload = json.dumps({
-            "object_id": str(uuid.uuid4()),
+    def _delete_runtime_message(self, target, name="test"):
+        """Delete Runtime message helper function."""
+        return self._control_message("/".join([self.mqtt_control, target]), {
             "action": "delete",
             "type": "req",
             "data": {
@@ -19,13 +21,23 @@ class OrchestratorMixin:
                 "uuid": target,
                 "name": name
             }
-        })
-        self.publish("/".join([self.mqtt_control, target]), payload, qos=2)
+        }, target=target)
 
-    def _create_module(self, data, target):
-        """Create Module helper function."""
-        payload = json.dumps({
-            "object_id": str(uuid.uuid4()),
+    def delete_runtime(self, target, name="test"):
+        """Instruct runtime to exit.
+
+        Returns
+        -------
+        ControlRequest
+            Pending request; resolves when the orchestrator responds.
+        """
+        req, (topic, payload, qos) = self._delete_runtime_message(
+            target, name=name)
+        return self._published(req, self.publish(topic, payload, qos=qos))
+
+    def _create_module_message(self, data, target):
+        """Create Module message helper function."""
+        return self._control_message(self.mqtt_control, {
             "action": "create",
             "type": "req",
             "data": {
@@ -33,13 +45,17 @@ class OrchestratorMixin:
                 "parent": target,
                 **data
             }
-        })
-        self.publish(self.mqtt_control, payload, qos=2)
+        }, target=data["uuid"])
 
-    def create_module_wasm(
-            self, target, name="module", path="wasm/apps/helloworld.wasm",
-            argv=[], env=[], period=10000, utilization=0.0):
-        """Create WASM module."""
+    def _create_module(self, data, target):
+        """Create Module helper function."""
+        req, (topic, payload, qos) = self._create_module_message(data, target)
+        return self._published(req, self.publish(topic, payload, qos=qos))
+
+    def _module_data(
+            self, name="module", path="wasm/apps/helloworld.wasm",
+            argv=[], env=[], period=_PERIOD, utilization=0.0):
+        """Generate module UUID and WASM module create request data."""
         module_uuid = str(uuid.uuid4())
         payload = {
             "uuid": module_uuid,
@@ -53,22 +69,207 @@ class OrchestratorMixin:
                 "period": period,
                 "runtime": int(utilization * period)
             }
-        self._create_module(payload, target)
-        return module_uuid
+        return module_uuid, payload
 
-    def delete_module(self, module):
-        """Delete module."""
-        payload = json.dumps({
-            "uuid": str(uuid.uuid4()),
+    def create_module_wasm(
+            self, target, name="module", path="wasm/apps/helloworld.wasm",
+            argv=[], env=[], period=10000, utilization=0.0):
+        """Create WASM module."""
+        _, payload = self._module_data(
+            name=name, path=path, argv=argv, env=env, period=period,
+            utilization=utilization)
+        return self._create_module(payload, target)
+
+    def _delete_module_message(self, module):
+        """Delete Module message helper function."""
+        return self._control_message(self.mqtt_control, {
             "type": "req",
             "action": "delete",
             "data": {"uuid": module}
-        })
-        self.publish(self.mqtt_control, payload, qos=2)
+        }, target=module)
+
+    def delete_module(self, module):
+        """Delete module.
+
+        Returns
+        -------
+        ControlRequest
+            Pending request; resolves when the orchestrator responds.
+        """
+        req, (topic, payload, qos) = self._delete_module_message(module)
+        return self._published(req, self.publish(topic, payload, qos=qos))
+
+    def _delete_bulk(
+            self, messages, registry, wait="publish", inflight=64,
+            timeout=30., poll=0.5):
+        """Publish delete requests in bulk, and wait for them to complete.
+
+        Parameters
+        ----------
+        messages : (ControlRequest, (str, str, int))[]
+            Delete requests, and the messages to publish.
+        registry : Registry
+            Listing to poll if `wait="listing"`.
+
+        Returns
+        -------
+        dict
+            Result for each target UUID; see `delete_modules_bulk`.
+        """
+        start = time.perf_counter()
+        deadline = start + timeout
+        reqs = [req for req, _ in messages]
+        results = {
+            req.uuid: {"ok": False, "latency": float("nan"), "error": ""}
+            for req in reqs}
+
+        delivered = []
+
+        def _delivered(i, info, completed):
+            req = reqs[i]
+            if info.is_published():
+                results[req.uuid]["latency"] = completed - req.sent
+                delivered.append(req)
+            else:
+                results[req.uuid]["error"] = "not delivered"
+
+        try:
+            self.publish_pipelined(
+                [msg for _, msg in messages], inflight=inflight,
+                timeout=timeout,
+                on_publish=lambda i, info: self._published(reqs[i], info),
+                on_complete=_delivered)
+        except TimeoutError as e:
+            self.log.error("%s", e)
+
+        if wait == "publish":
+            for req in delivered:
+                results[req.uuid]["ok"] = True
+        elif wait == "confirm":
+            done, missing = self.wait_requests(
+                delivered, timeout=max(0., deadline - time.perf_counter()))
+            for req in done:
+                resp = req.result().get("data") or {}
+                if resp.get("result") == "error":
+                    results[req.uuid]["error"] = "rejected: {}".format(
+                        resp.get("details") or "no details")
+                else:
+                    results[req.uuid]["ok"] = True
+                    results[req.uuid]["latency"] = req.latency
+            for req in missing:
+                results[req.uuid]["error"] = "not confirmed"
+        elif wait == "listing":
+            remaining = {req.uuid: req for req in delivered}
+            while remaining:
+                registry.invalidate()
+                try:
+                    present = {rec["uuid"] for rec in registry.list()}
+                except Exception as e:
+                    self.log.warning("Could not get listing: %s", e)
+                    present = set(remaining)
+                now = time.perf_counter()
+                for target in [t for t in remaining if t not in present]:
+                    req = remaining.pop(target)
+                    results[target]["ok"] = True
+                    results[target]["latency"] = now - req.sent
+                if not remaining or now >= deadline:
+                    break
+                time.sleep(min(poll, max(0., deadline - now)))
+            for target in remaining:
+                results[target]["error"] = "still listed"
+        else:
+            raise ValueError("Invalid wait mode: {}".format(wait))
+
+        # Responses to requests we are no longer waiting for are dropped.
+        for req in reqs:
+            if not req.done():
+                self.cancel_request(req)
+
+        failed = sum(1 for r in results.values() if not r["ok"])
+        self.log.info(
+            "Deleted %d / %d targets in %.3fs (wait=%s).",
+            len(results) - failed, len(results), time.perf_counter() - start,
+            wait)
+        return results
+
+    def delete_modules_bulk(
+            self, modules, wait="publish", inflight=64, timeout=30.,
+            poll=0.5):
+        """Delete multiple modules with pipelined publishes.
+
+        All delete requests are published back-to-back with up to
+        `inflight` QoS 2 handshakes outstanding; this method returns once
+        every request has been delivered to the broker, and (depending on
+        `wait`) confirmed or removed, or once `timeout` has passed.
+
+        Parameters
+        ----------
+        modules : str[]
+            Module UUIDs to delete.
+        wait : str
+            What to wait for: `publish` (delivery to the broker), `confirm`
+            (a response from the orchestrator), or `listing` (the module
+            no longer appearing in the REST API listing).
+        inflight : int
+            Maximum number of outstanding delete requests.
+        timeout : float
+            Time limit for the whole teardown, in seconds.
+        poll : float
+            REST API polling interval for `wait="listing"`, in seconds.
+
+        Returns
+        -------
+        dict
+            Result for each module UUID, with `ok` (True if the wait
+            condition was met), `latency` (seconds from publishing the
+            request until the wait condition was met; NaN if it was not),
+            and `error` (reason for failure, or an empty string).
+        """
+        return self._delete_bulk(
+            [self._delete_module_message(mod) for mod in modules],
+            self.module_registry, wait=wait, inflight=inflight,
+            timeout=timeout, poll=poll)
+
+    def delete_runtimes_bulk(
+            self, runtimes, wait="publish", inflight=64, timeout=30.,
+            poll=0.5):
+        """Delete multiple runtimes with pipelined publishes.
+
+        Like `delete_modules_bulk`, for runtimes; runtime names are looked
+        up in the (cached) runtime registry.
+
+        Parameters
+        ----------
+        runtimes : str[]
+            Runtime UUIDs to delete.
+        wait : str
+            What to wait for: `publish` (delivery to the broker), `confirm`
+            (a response from the orchestrator), or `listing` (the runtime
+            no longer appearing in the REST API listing).
+        inflight : int
+            Maximum number of outstanding delete requests.
+        timeout : float
+            Time limit for the whole teardown, in seconds.
+        poll : float
+            REST API polling interval for `wait="listing"`, in seconds.
+
+        Returns
+        -------
+        dict
+            Result for each runtime UUID; see `delete_modules_bulk`.
+        """
+        messages = []
+        for rt in runtimes:
+            rec = self.runtime_registry.resolve(rt)
+            messages.append(self._delete_runtime_message(
+                rt, name="test" if rec is None else rec["name"]))
+        return self._delete_bulk(
+            messages, self.runtime_registry, wait=wait, inflight=inflight,
+            timeout=timeout, poll=poll)
 
     def create_module(
             self, runtime, name="module", path="wasm/tests/helloworld.wasm",
-            argv=[], env=[], aot=False, period=10000000, utilization=0.0):
+            argv=[], env=[], aot=False, period=_PERIOD, utilization=0.0):
         """Create module.
 
         Parameters
@@ -93,8 +294,9 @@ class OrchestratorMixin:
 
         Returns
         -------
-        str
-            ID of created module.
+        ControlRequest
+            Pending request; resolves when the orchestrator responds. The ID
+            of the created module is `.uuid`.
         """
         kwargs = {
             "name": name, "path": path, "argv": argv, "env": env,
@@ -106,17 +308,76 @@ class OrchestratorMixin:
             self, runtimes, path="wasm/apps/helloworld.wasm", **kwargs):
         """Create multiple modules; returns UUID as a dictionary."""
         return {
-            (rt, path): self.create_module(rt, path=path, **kwargs)
+            (rt, path): self.create_module(rt, path=path, **kwargs).uuid
             for rt in runtimes
         }
 
-    def _infer(self, mode, query):
-        res = []
-        for q in query:
-            resp = self._get_json("{}/{}".format(mode, q))
-            if resp:
-                res.append(resp['uuid'])
-        return res
+    def create_modules_bulk(
+            self, runtimes, path="wasm/apps/helloworld.wasm", inflight=64,
+            timeout=30., confirm=False, **kwargs):
+        """Create multiple modules with pipelined publishes.
+
+        Unlike `create_modules`, all create requests are published
+        back-to-back with up to `inflight` QoS 2 handshakes outstanding, and
+        this method only returns once every request has been delivered to
+        the broker.
+
+        Parameters
+        ----------
+        runtimes : str[]
+            Runtime IDs to create modules on.
+        path : str
+            Filepath to module binary/script.
+        inflight : int
+            Maximum number of outstanding create requests.
+        timeout : float
+            Time limit for delivering all requests, in seconds.
+        confirm : bool
+            If True, also waits (up to `timeout` seconds) for the
+            orchestrator to respond to every create request.
+        kwargs : dict
+            Passed on to `create_module`; `aot` is accepted but ignored.
+
+        Returns
+        -------
+        dict
+            Module UUIDs, keyed by (runtime, path).
+        """
+        kwargs.pop("aot", None)
+        modules = {}
+        pending = []
+        messages = []
+        for rt in runtimes:
+            module_uuid, data = self._module_data(path=path, **kwargs)
+            modules[(rt, path)] = module_uuid
+            req, msg = self._create_module_message(data, rt)
+            pending.append(req)
+            messages.append(msg)
+
+        elapsed = self.publish_pipelined(
+            messages, inflight=inflight, timeout=timeout,
+            on_publish=lambda i, info: self._published(pending[i], info))
+        self.log.info("Created %d modules in %.3fs.", len(modules), elapsed)
+
+        if confirm:
+            _, missing = self.wait_requests(pending, timeout=timeout)
+            if missing:
+                raise TimeoutError(
+                    "{} create requests were not confirmed: {}".format(
+                        len(missing), [r.uuid for r in missing]))
+        return modules
+
+    def _infer(self, registry, mode, query):
+        # Listen for create/delete messages to keep the registry fresh
+        self._subscribe_responses()
+        found = {q: registry.resolve(q) for q in query}
+
+        # Fall back to the REST API for anything not in the cached listing
+        missing = [q for q, rec in found.items() if rec is None]
+        if missing:
+            found.update(zip(missing, self.rest.get_many(
+                ["{}/{}".format(mode, q) for q in missing])))
+        return [found[q]['uuid'] for q in query if found[q]]
 
     def infer_runtimes(self, runtimes):
         """Infer runtime UUIDs.
@@ -126,30 +387,31 @@ class OrchestratorMixin:
           - last 4 characters of string-encoded UUID
           - full UUID.
         """
-        return self._infer("runtimes", runtimes)
+        return self._infer(self.runtime_registry, "runtimes", runtimes)
 
     def infer_modules(self, modules):
         """Infer module UUIDs."""
-        return self._infer("modules", modules)
+        return self._infer(self.module_registry, "modules", modules)
 
     def _get_json(self, address):
         """Get JSON from REST API."""
-        r = requests.get("{}/{}/".format(self.arts_api, address))
-        if r:
-            try:
-                return json.loads(r.text)
-            except Exception as e:
-                print(r.text)
-                raise e
-        return {}
+        return self.rest.get_json(address)
+
+    def iter_runtimes(self, prefetch=4):
+        """Iterate over runtimes from REST API, following pagination."""
+        return self.rest.iter_pages("runtimes", prefetch=prefetch)
+
+    def iter_modules(self, prefetch=4):
+        """Iterate over modules from REST API, following pagination."""
+        return self.rest.iter_pages("modules", prefetch=prefetch)
 
     def get_runtimes(self):
         """Get runtimes from REST API."""
-        return self._get_json("runtimes")['results']
+        return list(self.iter_runtimes())
 
     def get_modules(self):
         """Get modules from REST API."""
-        return self._get_json("modules")['results']
+        return list(self.iter_modules())
 
     def get_runtime(self, rt):
         """Get runtime full metadata from REST API."""
@@ -1,9 +1,70 @@
 """Inspect function signature for parsing."""
 
-import inspect
+import os
+import sys
+import pickle
 import argparse
 import json
-from docstring_parser import parse, DocstringStyle
+
+
+def _cache_dir():
+    return os.environ.get("SILVERLINE_CACHE", os.path.join(
+        os.path.expanduser("~"), ".cache", "libsilverline"))
+
+
+def _inspect(func):
+    """Get (name, description, signature default) for documented params.
+
+    Parameters without a signature entry have a default of `None`, and are
+    treated as strings.
+    """
+    import inspect
+    from docstring_parser import parse, DocstringStyle
+
+    doc = parse(func.__doc__, style=DocstringStyle.NUMPYDOC)
+    sig = inspect.signature(func)
+    params = []
+    for d in doc.params:
+        psig = sig.parameters.get(d.arg_name)
+        params.append((
+            d.arg_name, d.description.replace("\n", " "),
+            psig is not None, psig.default if psig else None))
+    return params
+
+
+def _argspec(func):
+    """Get parameter specification of `func`, cached on disk.
+
+    The cache is keyed by the mtime and size of the module source, so
+    editing a docstring or signature invalidates it. Caching never fails;
+    unwritable cache directories and corrupt entries are ignored.
+    """
+    try:
+        src = os.stat(sys.modules[func.__module__].__file__)
+        key = (src.st_mtime_ns, src.st_size)
+        path = os.path.join(_cache_dir(), "argspec", "{}.{}.pickle".format(
+            func.__module__, func.__qualname__))
+    except (AttributeError, KeyError, TypeError, OSError):
+        return _inspect(func)
+
+    try:
+        with open(path, "rb") as f:
+            cached_key, params = pickle.load(f)
+        if cached_key == key:
+            return params
+    except Exception:
+        pass
+
+    params = _inspect(func)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = "{}.{}".format(path, os.getpid())
+        with open(tmp, "wb") as f:
+            pickle.dump((key, params), f)
+        os.replace(tmp, path)
+    except Exception:
+        pass
+    return params
 
 
 class ArgumentParser(argparse.ArgumentParser):
@@ -19,25 +80,19 @@ class ArgumentParser(argparse.ArgumentParser):
             "Config file to load; priority is (1) explicitly passed args, "
             "(2) config file, (3) defaults"))
 
-    def _add_arg(self, parser, pdoc, psig, aliases):
-        if psig:
-            default = psig.default
-            dtype = type(default)
-        else:
-            default = None
-            dtype = str
+    def _add_arg(self, parser, name, desc, has_sig, default, aliases):
+        dtype = type(default) if has_sig else str
 
-        names = ["--{}".format(pdoc.arg_name)] + aliases.get(pdoc.arg_name, [])
-        desc = pdoc.description.replace("\n", " ")
+        names = ["--{}".format(name)] + aliases.get(name, [])
 
         if dtype is bool:
             parser.add_argument(*names, help=desc, action="store_true")
-            self.set_defaults(**{pdoc.arg_name: False})
+            self.set_defaults(**{name: False})
         elif dtype is list:
             parser.add_argument(*names, nargs='+', help=desc, default=default)
         else:
             parser.add_argument(*names, type=dtype, help=desc, default=default)
-        return pdoc.arg_name
+        return name
 
     def set_default_func(self, **kwargs):
         """Set defaults (to be executed as function)."""
@@ -79,15 +134,10 @@ class ArgumentParser(argparse.ArgumentParser):
             List of arguments found in docstring.
         """
         parser = self.add_argument_group(group)
-
-        doc = parse(func.__doc__, style=DocstringStyle.NUMPYDOC)
-        sig = inspect.signature(func)
-
         self._group_names[name] = (
             prefix, [
-                self._add_arg(
-                    parser, d, sig.parameters.get(d.arg_name), aliases)
-                for d in doc.params if d.arg_name not in exclude
+                self._add_arg(parser, *param, aliases)
+                for param in _argspec(func) if param[0] not in exclude
             ])
 
     def parse_args(self, argv=None):
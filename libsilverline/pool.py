@@ -0,0 +1,155 @@
+"""Sharded multi-process client pool."""
+
+import bisect
+import hashlib
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .client import Client
+from .latency import summarize, save_npz
+from .metrics import merge
+from .profilers import run_profilers
+
+
+# Worker process state; each worker process holds one connected Client.
+_client = None
+
+
+def _init(kwargs):
+    global _client
+    _client = Client(**kwargs)
+
+
+def _create_modules(runtimes, path, bulk, kwargs):
+    if bulk:
+        return _client.create_modules_bulk(runtimes, path=path, **kwargs)
+    return _client.create_modules(runtimes, path=path, **kwargs)
+
+
+def _run_profilers(modules, kwargs):
+    return run_profilers(_client, modules, **kwargs)
+
+
+def _metrics():
+    return _client.metrics()
+
+
+def _stop():
+    _client.loop_stop()
+    _client.disconnect()
+
+
+def _hash(key):
+    return int(hashlib.md5(key.encode()).hexdigest()[:16], 16)
+
+
+class ClientPool:
+    """Pool of SilverLine clients, each in a separate worker process.
+
+    Spreads MQTT traffic across `workers` connections (and cores). Targets
+    are assigned to workers with a consistent hash: modules by module UUID
+    (for profiling), and runtimes by runtime UUID (for module creation).
+    REST API lookups are made by a local (unconnected) client.
+
+    Parameters
+    ----------
+    workers : int
+        Number of worker processes.
+    replicas : int
+        Number of points per worker on the consistent hash ring.
+    kwargs : dict
+        Arguments passed on to `Client` in each worker.
+    """
+
+    def __init__(self, workers=4, replicas=160, **kwargs):
+        kwargs.pop("connect", None)
+        self.client = Client(connect=False, **kwargs)
+
+        ctx = mp.get_context("spawn")
+        self.workers = [
+            ProcessPoolExecutor(
+                max_workers=1, mp_context=ctx, initializer=_init,
+                initargs=(kwargs,))
+            for _ in range(workers)]
+
+        ring = sorted(
+            (_hash("{}:{}".format(w, r)), w)
+            for w in range(workers) for r in range(replicas))
+        self._ring_keys = [k for k, _ in ring]
+        self._ring = [w for _, w in ring]
+
+    def shard(self, key):
+        """Get index of the worker responsible for a UUID."""
+        idx = bisect.bisect(self._ring_keys, _hash(key))
+        return self._ring[idx % len(self._ring)]
+
+    def _partition(self, items, key):
+        shards = [[] for _ in self.workers]
+        for item in items:
+            shards[self.shard(key(item))].append(item)
+        return shards
+
+    def infer_runtimes(self, runtimes):
+        """Infer runtime UUIDs; see `Client.infer_runtimes`."""
+        return self.client.infer_runtimes(runtimes)
+
+    def infer_modules(self, modules):
+        """Infer module UUIDs; see `Client.infer_modules`."""
+        return self.client.infer_modules(modules)
+
+    def create_modules(
+            self, runtimes, path="wasm/apps/helloworld.wasm", bulk=False,
+            **kwargs):
+        """Create modules from all workers; returns UUIDs as a dictionary.
+
+        If `bulk`, each worker uses `create_modules_bulk` instead.
+        """
+        futures = [
+            w.submit(_create_modules, shard, path, bulk, kwargs)
+            for w, shard in zip(
+                self.workers, self._partition(runtimes, lambda rt: rt))
+            if shard]
+        modules = {}
+        for f in futures:
+            modules.update(f.result())
+        return modules
+
+    def run_profilers(self, modules, npz="", **kwargs):
+        """Run profilers on all workers (see `run_profilers`).
+
+        Each worker profiles the modules assigned to it by module UUID; the
+        per-module results of all workers are merged. If `npz` is passed,
+        the merged latency samples are saved to it.
+        """
+        shards = self._partition(modules.items(), lambda kv: kv[1])
+        futures = [
+            w.submit(_run_profilers, dict(shard), kwargs)
+            for w, shard in zip(self.workers, shards) if shard]
+
+        results = {}
+        for f in futures:
+            results.update(f.result())
+        if npz:
+            save_npz(npz, results)
+        return results
+
+    @staticmethod
+    def aggregate(results):
+        """Summarize latency (see `summarize`) across all modules."""
+        if not results:
+            return summarize([])
+        return summarize(np.concatenate([
+            r["latency"] for r in results.values()]))
+
+    def metrics(self):
+        """Get metrics of all workers (see `Client.metrics`), merged."""
+        return merge(
+            f.result() for f in [w.submit(_metrics) for w in self.workers])
+
+    def loop_stop(self):
+        """Disconnect all workers and shut down the pool."""
+        for w in self.workers:
+            w.submit(_stop).result()
+            w.shutdown()
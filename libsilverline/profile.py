@@ -1,24 +1,31 @@
 """Profiling mixins for SilverLine Client."""
 
-import json
-import uuid
-
 
 class ProfileMixin:
     """Profiler API mixins."""
 
     def reset(self, metadata):
-        """Reset profiler state."""
-        self.publish(
-            "{}/proc/profile/control".format(self.realm), json.dumps({
-                "object_id": str(uuid.uuid4()),
+        """Reset profiler state.
+
+        Returns
+        -------
+        ControlRequest
+            Pending request; resolves when the orchestrator responds.
+        """
+        return self._request(
+            "{}/proc/profile/control".format(self.realm), {
                 "action": "reset",
-                "data": metadata}), qos=2)
+                "data": metadata})
 
     def save(self, metadata):
-        """Save profiler state."""
-        self.publish(
-            "{}/proc/profile/control".format(self.realm), json.dumps({
-                "object_id": str(uuid.uuid4()),
+        """Save profiler state.
+
+        Returns
+        -------
+        ControlRequest
+            Pending request; resolves when the orchestrator responds.
+        """
+        return self._request(
+            "{}/proc/profile/control".format(self.realm), {
                 "action": "save",
-                "data": metadata}), qos=2)
+                "data": metadata})
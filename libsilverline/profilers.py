@@ -3,14 +3,30 @@
 from tqdm import tqdm
 import time
 import threading
+from collections import deque
 import numpy as np
 
-from .data import DirichletProcess
+from .data import DirichletProcess, PayloadPool
+from .scheduler import Scheduler
+from .latency import LatencyBuffer, summarize, save_npz
+from .store import ResultStore
+from .metrics import Metrics
+
+
+def _rtt_histogram(client):
+    """Get the client's profiler round-trip latency histogram."""
+    stats = getattr(client, "stats", None)
+    if stats is None:
+        stats = Metrics()
+    return stats.histogram("profiler_rtt_seconds")
 
 
 class ActiveProfiler:
     """Active fixed-iteration profiler.
 
+    Records the round-trip latency (in nanoseconds) of each input in
+    `latency`.
+
     Parameters
     ----------
     client : libsilverline.Client
@@ -27,14 +43,21 @@ class ActiveProfiler:
         If >=0, prints a progress bar at this position.
     desc : str
         Runtime name (displayed in progress bar).
+    scheduler : Scheduler
+        Scheduler for delayed sends; creates a new one if None.
     """
 
     def __init__(
             self, client, module, data=None,
-            n=100, delay=0.1, pbar=-1, desc='rt'):
+            n=100, delay=0.1, pbar=-1, desc='rt', scheduler=None):
 
         self.data = data
         self.client = client
+        self.scheduler = Scheduler() if scheduler is None else scheduler
+        self.module = module
+        self.latency = LatencyBuffer(capacity=min(n, 1024))
+        self.rtt = _rtt_histogram(client)
+        self.sent = None
 
         # `idx` counts the number of arrived packets, but the first packet
         # is really just an ACK packet sent after initialization!
@@ -54,8 +77,19 @@ class ActiveProfiler:
         else:
             self.pbar = None
 
-    def callback(self, _):
+    def send(self):
+        """Send next input."""
+        payload = self.data.generate()
+        self.sent = time.perf_counter_ns()
+        self.client.publish(self.topic, payload, qos=1)
+
+    def callback(self, client, userdata, msg):
         """Callback for triggering the next period."""
+        if self.sent is not None:
+            rtt = time.perf_counter_ns() - self.sent
+            self.latency.append(rtt)
+            self.rtt.observe(rtt * 1e-9)
+            self.sent = None
         if self.pbar and self.idx >= 0:
             self.pbar.update(1)
         self.idx += 1
@@ -64,8 +98,7 @@ class ActiveProfiler:
             self.client.publish(self.topic, b"exit", qos=2)
             self.semaphore.release()
         else:
-            time.sleep(self.delay)
-            self.client.publish(self.topic, self.data.generate(), qos=9)
+            self.scheduler.call_later(self.delay, self.send)
 
     @staticmethod
     def run(profilers):
@@ -82,6 +115,9 @@ class ActiveProfiler:
 class TimedProfiler:
     """Active time-limited profiler.
 
+    Records the round-trip latency (in nanoseconds) of each input in
+    `latency`.
+
     Parameters
     ----------
     client : libsilverline.Client
@@ -92,12 +128,19 @@ class TimedProfiler:
         Generator for random input data.
     delay : float
         Delay in seconds between periods.
+    scheduler : Scheduler
+        Scheduler for delayed sends; creates a new one if None.
     """
 
-    def __init__(self, client, module, data, delay=0.1):
+    def __init__(self, client, module, data, delay=0.1, scheduler=None):
 
         self.data = data
         self.client = client
+        self.scheduler = Scheduler() if scheduler is None else scheduler
+        self.module = module
+        self.latency = LatencyBuffer()
+        self.rtt = _rtt_histogram(client)
+        self.sent = None
 
         self.delay = delay
         self.topic = "benchmark/in/{}".format(module)
@@ -109,14 +152,24 @@ class TimedProfiler:
 
         self.done = False
 
+    def send(self):
+        """Send next input."""
+        payload = self.data.generate()
+        self.sent = time.perf_counter_ns()
+        self.client.publish(self.topic, payload, qos=1)
+
     def callback(self, client, userdata, msg):
         """Callback for triggering the next period."""
+        if self.sent is not None:
+            rtt = time.perf_counter_ns() - self.sent
+            self.latency.append(rtt)
+            self.rtt.observe(rtt * 1e-9)
+            self.sent = None
         if self.done:
             self.client.publish(self.topic, b"exit", qos=2)
             self.semaphore.release()
         else:
-            time.sleep(self.delay)
-            self.client.publish(self.topic, self.data.generate(), qos=1)
+            self.scheduler.call_later(self.delay, self.send)
 
     @staticmethod
     def run(profilers, duration=60):
@@ -130,6 +183,258 @@ class TimedProfiler:
             p.semaphore.acquire(timeout=10)
 
 
+class OpenLoopProfiler:
+    """Open-loop profiler sending at a target rate, independent of replies.
+
+    Sending starts once the module's first (ACK) packet arrives. Replies are
+    matched to sends in FIFO order (i.e. assumes the module processes its
+    inputs in order), and their round-trip latency (in nanoseconds) is
+    recorded in `latency`.
+
+    Parameters
+    ----------
+    client : libsilverline.Client
+        SilverLine mqtt client interface.
+    module : str
+        Module UUID to interact with.
+    data : DirichletProcess
+        Generator for random input data.
+    rate : float
+        Target send rate, in messages per second.
+    arrivals : str
+        Inter-arrival times; `fixed` (constant interval) or `poisson`
+        (exponentially distributed intervals).
+    tolerance : float
+        Sends more than this many seconds after their deadline are counted
+        as late.
+    max_lag : float
+        Sends more than this many seconds after their deadline are dropped.
+    scheduler : Scheduler
+        Scheduler used for pacing; creates a new one if None.
+    """
+
+    def __init__(
+            self, client, module, data, rate=10., arrivals="fixed",
+            tolerance=1e-3, max_lag=0.1, scheduler=None):
+
+        if arrivals not in {"fixed", "poisson"}:
+            raise ValueError("Invalid arrival process: {}".format(arrivals))
+
+        self.data = data
+        self.client = client
+        self.scheduler = (
+            Scheduler(spin=1e-3) if scheduler is None else scheduler)
+        self.module = module
+        self.topic = "benchmark/in/{}".format(module)
+
+        self.interval = 1 / rate
+        self.arrivals = arrivals
+        self.tolerance = tolerance
+        self.max_lag = max_lag
+
+        self.latency = LatencyBuffer()
+        self.rtt = _rtt_histogram(client)
+
+        self.inflight = deque()
+        self.sent = 0
+        self.late = 0
+        self.dropped = 0
+        self.started = None
+        self.last = None
+        self.deadline = None
+        self.done = False
+
+        self.semaphore = threading.Semaphore()
+        self.semaphore.acquire()
+
+        self.client.register_callback(
+            "benchmark/out/{}".format(module), self.callback)
+
+    def _interval(self):
+        if self.arrivals == "poisson":
+            return np.random.exponential(self.interval)
+        return self.interval
+
+    def send(self):
+        """Send input if it is not too late, and schedule the next one."""
+        if self.done:
+            return
+
+        lag = time.perf_counter() - self.deadline
+        if lag > self.max_lag:
+            self.dropped += 1
+        else:
+            if lag > self.tolerance:
+                self.late += 1
+            payload = self.data.generate()
+            self.inflight.append(time.perf_counter_ns())
+            self.client.publish(self.topic, payload, qos=1)
+            self.last = time.perf_counter()
+            self.sent += 1
+
+        self.deadline += self._interval()
+        self.scheduler.call_at(self.deadline, self.send)
+
+    def callback(self, client, userdata, msg):
+        """Callback for recording replies (or starting, on the first one)."""
+        if self.started is None:
+            self.started = self.deadline = time.perf_counter()
+            self.scheduler.call_at(self.deadline, self.send)
+        elif self.inflight:
+            sent = self.inflight.popleft()
+            rtt = time.perf_counter_ns() - sent
+            self.latency.append(rtt)
+            self.rtt.observe(rtt * 1e-9)
+            if self.done and not self.inflight:
+                self.semaphore.release()
+
+    def summary(self):
+        """Get send statistics; `rate` is the achieved send rate."""
+        elapsed = 0. if self.started is None else self.last - self.started
+        return {
+            "sent": self.sent, "late": self.late, "dropped": self.dropped,
+            "rate": self.sent / elapsed if elapsed > 0 else 0.}
+
+    @staticmethod
+    def run(profilers, duration=60):
+        """Run profilers, wait for outstanding replies, and terminate."""
+        for _ in tqdm(range(100)):
+            time.sleep(duration / 100)
+
+        for p in profilers:
+            p.done = True
+        for p in profilers:
+            if p.inflight:
+                p.semaphore.acquire(timeout=10)
+        for p in profilers:
+            p.client.publish(p.topic, b"exit", qos=2)
+
+
+class PipelinedProfiler:
+    """Pipelined closed-loop profiler with a sweep over in-flight depths.
+
+    Keeps up to `depth` inputs outstanding at once, sending a new input for
+    each reply until `n` inputs have been sent; then waits for the window to
+    drain, and moves on to the next depth. Sending starts once the module's
+    first (ACK) packet arrives, and the exit signal is sent after the last
+    depth.
+
+    Each input is tagged with a sequence number (8 bytes, little endian,
+    after the `>>> ` prefix); replies which carry the tag are matched by
+    sequence number, and other replies are matched to the oldest outstanding
+    input. Round-trip latency (in nanoseconds) is recorded in `latency`.
+
+    Parameters
+    ----------
+    client : libsilverline.Client
+        SilverLine mqtt client interface.
+    module : str
+        Module UUID to interact with.
+    data : DirichletProcess
+        Generator for random input data.
+    n : int
+        Number of inputs to send for each depth.
+    depth : int[]
+        In-flight window sizes to sweep over.
+    """
+
+    def __init__(self, client, module, data, n=100, depth=[1]):
+
+        self.data = data
+        self.client = client
+        self.module = module
+        self.topic = "benchmark/in/{}".format(module)
+
+        self.n = n
+        self.depths = [int(d) for d in depth]
+        self.phase = -1
+        self.seq = 0
+        self.issued = 0
+        self.outstanding = {}
+
+        self.latency = LatencyBuffer(
+            capacity=min(n * len(self.depths), 1024))
+        self.rtt = _rtt_histogram(client)
+
+        self.start = None
+        self.bounds = [0]
+        self.throughput = []
+
+        self.semaphore = threading.Semaphore()
+        self.semaphore.acquire()
+
+        self.client.register_callback(
+            "benchmark/out/{}".format(module), self.callback)
+
+    def send(self):
+        """Send next input, tagged with its sequence number."""
+        payload = self.data.generate(min_size=12)
+        payload = b"".join(
+            [payload[:4], self.seq.to_bytes(8, "little"), payload[12:]])
+        self.outstanding[self.seq] = time.perf_counter_ns()
+        self.client.publish(self.topic, payload, qos=1)
+        self.seq += 1
+        self.issued += 1
+
+    def _next_phase(self):
+        self.phase += 1
+        if self.phase >= len(self.depths):
+            self.client.publish(self.topic, b"exit", qos=2)
+            self.semaphore.release()
+        else:
+            self.issued = 0
+            self.start = time.perf_counter()
+            for _ in range(min(self.depths[self.phase], self.n)):
+                self.send()
+
+    def _match(self, payload):
+        """Get send timestamp of the input matching this reply."""
+        if len(payload) >= 12 and payload[:4] == b">>> ":
+            sent = self.outstanding.pop(
+                int.from_bytes(payload[4:12], "little"), None)
+            if sent is not None:
+                return sent
+        if self.outstanding:
+            return self.outstanding.pop(next(iter(self.outstanding)))
+        return None
+
+    def callback(self, client, userdata, msg):
+        """Callback for matching replies and keeping the window full."""
+        if self.phase < 0:
+            self._next_phase()
+            return
+
+        sent = self._match(msg.payload)
+        if sent is None:
+            return
+        rtt = time.perf_counter_ns() - sent
+        self.latency.append(rtt)
+        self.rtt.observe(rtt * 1e-9)
+
+        if self.issued < self.n:
+            self.send()
+        elif not self.outstanding:
+            self.throughput.append(self.n / (time.perf_counter() - self.start))
+            self.bounds.append(len(self.latency))
+            self._next_phase()
+
+    def summary(self):
+        """Get throughput (replies per second) and median latency by depth."""
+        latency = self.latency.array
+        return {
+            "depth": np.array(self.depths[:len(self.throughput)]),
+            "throughput": np.array(self.throughput),
+            "depth_p50": np.array([
+                np.median(latency[a:b])
+                for a, b in zip(self.bounds[:-1], self.bounds[1:])])}
+
+    @staticmethod
+    def run(profilers):
+        """Run profilers and join on completion."""
+        for p in profilers:
+            p.semaphore.acquire()
+
+
 class PassiveProfiler:
     """Passive time-limited profiler.
 
@@ -194,8 +499,9 @@ class PassiveStrictProfiler:
 
 
 def run_profilers(
-        client, modules,
-        type="run", mean_size=1000., alpha=1., n=100, delay=0.1, duration=60.):
+        client, modules, type="run", mean_size=1000., alpha=1., n=100,
+        delay=0.1, duration=60., rate=10., arrivals="fixed", depth=[1],
+        entropy=64, subscribe_timeout=10., npz="", store=""):
     """Create and run profilers.
 
     Parameters
@@ -207,46 +513,143 @@ def run_profilers(
     type : str
         Profiler type. Can be: `run` (just run, do nothing), `active`
         (active profiling with fixed rounds), `timed` (active profiling with
-        time limit), and `passive` (spawn and wait)
+        time limit), `openloop` (send at a fixed rate regardless of replies,
+        with time limit), `pipelined` (active profiling with fixed rounds and
+        multiple inputs in flight), `passive` (spawn and wait), and `strict`
+        (spawn, wait, and force-terminate)
     n : int
-        Number of rounds for `active` profiler.
+        Number of rounds for `active` profiler, and for each depth of the
+        `pipelined` profiler.
     delay : float
         Delay between rounds for `active` and `timed` profilers.
     mean_size : float
-        Samples each data packet from Geometric(1 / mean_size) for `active` and
-        `timed` profilers.
+        Samples each data packet from Geometric(1 / mean_size) for `active`,
+        `timed`, and `openloop` profilers.
     alpha : float
-        Dirichlet process new table probability for `active` and `timed`.
+        Dirichlet process new table probability for `active`, `timed`, and
+        `openloop` profilers.
+    entropy : int
+        Number of distinct payload offsets in the shared random payload
+        arena; if 0, generates fresh random bytes for every message instead.
     duration : float
-        Profiling duration for `timed` and `passive` profilers.
+        Profiling duration for `timed`, `openloop`, and `passive` profilers.
+    rate : float
+        Target send rate (messages per second) for `openloop` profiler.
+    arrivals : str
+        Inter-arrival times for `openloop` profiler: `fixed` or `poisson`.
+    depth : int[]
+        Number of inputs in flight for `pipelined` profiler; if several are
+        given, sweeps over each depth in order.
+    subscribe_timeout : float
+        Time limit for the broker to acknowledge all profiler subscriptions
+        before profiling starts.
+    npz : str
+        If passed, saves per-module latency samples to this `.npz` file.
+    store : str
+        If passed, streams per-module latency samples to a `ResultStore` in
+        this directory while profiling, tagged with the runtime, module,
+        path, and profiling parameters.
+
+    Returns
+    -------
+    dict
+        Round-trip latency for each module UUID (`active`, `timed`, and
+        `openloop` only), with per-sample latencies `latency` (int64 array,
+        in nanoseconds), and their summary `n`, `p50`, `p90`, `p99`, `max`.
+        `openloop` also reports `sent`, `late`, `dropped` and the achieved
+        send `rate`; `pipelined` also reports `throughput` (replies per
+        second) and `depth_p50` (median latency) for each `depth`.
     """
+    pool = None
+    if entropy > 0 and type in {"active", "timed", "openloop", "pipelined"}:
+        pool = PayloadPool(entropy=entropy)
+
     def _make_dp():
         return DirichletProcess(
-            lambda: np.random.geometric(1 / mean_size), alpha=alpha)
-
-    if type == "active":
-        profilers = [
-            ActiveProfiler(
-                client, mod, data=_make_dp(),
-                delay=delay, n=n, pbar=i, desc=rt)
-            for i, ((rt, _), mod) in enumerate(modules.items())]
-        ActiveProfiler.run(profilers)
-    elif type == "timed":
-        profilers = [
-            TimedProfiler(client, mod, data=_make_dp(), delay=delay)
-            for (_, mod) in modules.items()]
-        TimedProfiler.run(profilers, duration=duration)
-    elif type == "passive":
-        profilers = [
-            PassiveProfiler(client, mod)
-            for (_, mod) in modules.items()]
-        PassiveProfiler.run(profilers, duration=duration)
-    elif type == "strict":
-        profilers = [
-            PassiveStrictProfiler(client, mod)
-            for (_, mod) in modules.items()]
-        PassiveStrictProfiler.run(profilers, duration=duration)
-    elif type == "run":
-        pass
-    else:
-        raise ValueError("Invalid profiling mode: {}".format(type))
+            lambda: np.random.geometric(1 / mean_size), alpha=alpha,
+            pool=pool)
+
+    scheduler = Scheduler(spin=1e-3 if type == "openloop" else 0.)
+    profilers = []
+    run = {}
+    writers = []
+    if store and type not in {"run", "passive", "strict"}:
+        store = ResultStore(store)
+        params = {
+            "type": type, "n": n, "delay": delay, "mean_size": mean_size,
+            "alpha": alpha, "entropy": entropy, "duration": duration,
+            "rate": rate, "arrivals": arrivals, "depth": depth}
+        for key, mod in modules.items():
+            rt, path = key if isinstance(key, tuple) else (None, key)
+            writers.append(store.writer(
+                {"latency": "int64"}, runtime=rt, module=mod, path=path,
+                params=params))
+
+    try:
+        with client.subscription_batch(timeout=subscribe_timeout):
+            if type == "active":
+                profilers = [
+                    ActiveProfiler(
+                        client, mod, data=_make_dp(),
+                        delay=delay, n=n, pbar=i, desc=rt, scheduler=scheduler)
+                    for i, ((rt, _), mod) in enumerate(modules.items())]
+            elif type == "timed":
+                profilers = [
+                    TimedProfiler(
+                        client, mod, data=_make_dp(), delay=delay,
+                        scheduler=scheduler)
+                    for (_, mod) in modules.items()]
+                run = {"duration": duration}
+            elif type == "openloop":
+                profilers = [
+                    OpenLoopProfiler(
+                        client, mod, data=_make_dp(), rate=rate,
+                        arrivals=arrivals, scheduler=scheduler)
+                    for (_, mod) in modules.items()]
+                run = {"duration": duration}
+            elif type == "pipelined":
+                profilers = [
+                    PipelinedProfiler(
+                        client, mod, data=_make_dp(), n=n, depth=depth)
+                    for (_, mod) in modules.items()]
+            elif type == "passive":
+                profilers = [
+                    PassiveProfiler(client, mod)
+                    for (_, mod) in modules.items()]
+                run = {"duration": duration}
+            elif type == "strict":
+                profilers = [
+                    PassiveStrictProfiler(client, mod)
+                    for (_, mod) in modules.items()]
+                run = {"duration": duration}
+            elif type == "run":
+                pass
+            else:
+                raise ValueError("Invalid profiling mode: {}".format(type))
+
+            # Attach writers before the batch subscribes, since profilers
+            # may start recording as soon as their subscription is acked.
+            for p, w in zip(profilers, writers):
+                p.latency = w
+
+        if profilers:
+            profilers[0].run(profilers, **run)
+    finally:
+        scheduler.stop()
+        for w in writers:
+            w.close()
+
+    if type not in {"run", "strict"}:
+        for mod in modules.values():
+            client.unregister_callback("benchmark/out/{}".format(mod))
+
+    results = {}
+    for p in profilers:
+        if hasattr(p, "latency"):
+            latency = p.latency.array
+            results[p.module] = {
+                "latency": latency, **summarize(latency),
+                **(p.summary() if hasattr(p, "summary") else {})}
+    if npz:
+        save_npz(npz, results)
+    return results
@@ -0,0 +1,65 @@
+"""Client-side runtime/module registry cache."""
+
+import time
+from threading import Lock
+
+
+class Registry:
+    """Indexed registry of runtimes or modules, cached with a TTL.
+
+    Records are indexed by full UUID, by the last 4 hex characters of the
+    UUID, and by name, so alias resolution is a local dictionary lookup.
+    The registry is reloaded on access once it has expired (after `ttl`
+    seconds), or after it has been explicitly invalidated.
+
+    Parameters
+    ----------
+    fetch : callable (-> dict[])
+        Loads all records (each with `uuid` and `name` keys).
+    ttl : float
+        Time in seconds until the cached records expire.
+    """
+
+    def __init__(self, fetch, ttl=10.):
+        self.fetch = fetch
+        self.ttl = ttl
+
+        self._lock = Lock()
+        self._expires = 0.
+        self._records = []
+        self._index = {}
+
+    def invalidate(self):
+        """Mark registry as stale; it is reloaded on next access."""
+        self._expires = 0.
+
+    def _refresh(self):
+        with self._lock:
+            if time.monotonic() < self._expires:
+                return
+            records = list(self.fetch())
+            index = {}
+            # Priority: UUID, then last 4 characters of UUID, then name.
+            for key in ["name", "suffix", "uuid"]:
+                for rec in records:
+                    alias = rec["uuid"][-4:] if key == "suffix" else rec[key]
+                    index[alias] = rec
+            self._records = records
+            self._index = index
+            self._expires = time.monotonic() + self.ttl
+
+    def list(self):
+        """Get all records."""
+        if time.monotonic() >= self._expires:
+            self._refresh()
+        return self._records
+
+    def resolve(self, alias):
+        """Get record by full UUID, last 4 characters of UUID, or name.
+
+        Returns `None` if no record matches; if several records share a name
+        or UUID suffix, which one is returned is undefined.
+        """
+        if time.monotonic() >= self._expires:
+            self._refresh()
+        return self._index.get(alias)
@@ -0,0 +1,168 @@
+"""Pooled REST API session."""
+
+import json
+import math
+from collections import deque
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qs, urlencode
+
+
+class RestSession:
+    """Keep-alive REST API session with connection pooling and retries.
+
+    Parameters
+    ----------
+    api : str
+        REST API base address.
+    timeout : float
+        Connect/read timeout for each request, in seconds.
+    retries : int
+        Number of retries for connection errors and 502/503/504 responses.
+    pool : int
+        Maximum number of pooled connections, which is also the maximum
+        number of concurrent requests issued by `get_many`.
+
+    Notes
+    -----
+    `requests` is only imported (and the session created) on first use.
+    """
+
+    def __init__(self, api, timeout=5., retries=3, pool=16):
+        self.api = api
+        self.timeout = timeout
+        self.pool = pool
+        self.retries = retries
+
+        self._session = None
+        self._session_lock = Lock()
+        self._executor = None
+        self._executor_lock = Lock()
+
+    @property
+    def session(self):
+        """Underlying `requests.Session`; created on first access."""
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.retries, backoff_factor=0.1,
+            status_forcelist=(502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool, max_retries=retry)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def get_url(self, url):
+        """Get JSON from full URL; returns an empty dict on HTTP errors."""
+        r = self.session.get(url, timeout=self.timeout)
+        if r:
+            try:
+                return json.loads(r.text)
+            except Exception as e:
+                print(r.text)
+                raise e
+        return {}
+
+    def get_json(self, address):
+        """Get JSON from REST API address (relative to the API base)."""
+        return self.get_url("{}/{}/".format(self.api, address))
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.pool)
+            return self._executor
+
+    def get_many(self, addresses):
+        """Get JSON from many addresses concurrently, preserving order."""
+        if len(addresses) <= 1:
+            return [self.get_json(a) for a in addresses]
+        return list(self._pool().map(self.get_json, addresses))
+
+    @staticmethod
+    def _page_urls(page):
+        """Infer the URLs of all remaining pages from the first page.
+
+        Supports page number (`?page=2`) and limit/offset
+        (`?limit=100&offset=100`) pagination; returns `None` if the scheme
+        is not recognized.
+        """
+        results = page.get("results") or []
+        count = page.get("count")
+        if not page.get("next") or not results or count is None:
+            return None
+
+        parts = urlsplit(page["next"])
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+
+        def _url(**kwargs):
+            return urlunsplit(parts._replace(
+                query=urlencode({**query, **kwargs})))
+
+        if "page" in query:
+            pages = math.ceil(count / len(results))
+            return [
+                _url(page=i) for i in range(int(query["page"]), pages + 1)]
+        elif "offset" in query:
+            limit = int(query.get("limit", len(results)))
+            return [
+                _url(offset=i)
+                for i in range(int(query["offset"]), count, limit)]
+        else:
+            return None
+
+    def iter_pages(self, address, prefetch=4):
+        """Iterate over all records of a (possibly paginated) listing.
+
+        Records are yielded in order as soon as their page arrives; up to
+        `prefetch` upcoming pages (inferred from the first page's `count`)
+        are fetched concurrently. `next` links are then followed one page
+        at a time from the last of these pages, which picks up records
+        added while listing; if the pagination scheme is not recognized,
+        all pages are fetched this way.
+
+        Parameters
+        ----------
+        address : str
+            REST API address of the listing.
+        prefetch : int
+            Maximum number of pages to fetch ahead.
+        """
+        page = self.get_json(address)
+        if isinstance(page, list):
+            yield from page
+            return
+        yield from page.get("results", [])
+
+        urls = self._page_urls(page)
+        if urls is not None:
+            urls = deque(urls)
+            window = deque()
+            while urls or window:
+                while urls and len(window) < prefetch:
+                    window.append(
+                        self._pool().submit(self.get_url, urls.popleft()))
+                page = window.popleft().result()
+                yield from page.get("results", [])
+
+        while page.get("next"):
+            page = self.get_url(page["next"])
+            yield from page.get("results", [])
+
+    def close(self):
+        """Close pooled connections and worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._session is not None:
+            self._session.close()
@@ -0,0 +1,108 @@
+"""MQTT topic router."""
+
+from threading import Lock
+
+
+class _Node:
+    __slots__ = ("children", "callback")
+
+    def __init__(self):
+        self.children = {}
+        self.callback = None
+
+
+class TopicRouter:
+    """Route topics to callbacks registered on MQTT topic filters.
+
+    Filters without wildcards are kept in a dictionary, so the common case
+    (one exact topic per module) is a single lookup. Filters with `+`/`#`
+    wildcards are compiled into a topic trie, which is walked in time
+    proportional to the topic depth. Like paho, each filter maps to a single
+    callback, and registering a filter again replaces its callback.
+    """
+
+    def __init__(self):
+        self.exact = {}
+        self.root = _Node()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self.exact) + self._count(self.root)
+
+    def _count(self, node):
+        return (node.callback is not None) + sum(
+            self._count(c) for c in node.children.values())
+
+    def add(self, topic, callback):
+        """Register callback for topic filter."""
+        with self._lock:
+            if "+" not in topic and "#" not in topic:
+                self.exact[topic] = callback
+            else:
+                node = self.root
+                for level in topic.split("/"):
+                    node = node.children.setdefault(level, _Node())
+                node.callback = callback
+
+    def remove(self, topic):
+        """Remove callback for topic filter; returns False if not found."""
+        with self._lock:
+            if "+" not in topic and "#" not in topic:
+                return self.exact.pop(topic, None) is not None
+
+            path = [(None, None, self.root)]
+            for level in topic.split("/"):
+                node = path[-1][2].children.get(level)
+                if node is None:
+                    return False
+                path.append((path[-1][2], level, node))
+            if path[-1][2].callback is None:
+                return False
+            path[-1][2].callback = None
+
+            # Prune empty branches
+            for parent, level, node in reversed(path[1:]):
+                if node.children or node.callback is not None:
+                    break
+                del parent.children[level]
+            return True
+
+    def match(self, topic):
+        """Get callbacks for all filters matching topic."""
+        with self._lock:
+            exact = self.exact.get(topic)
+            matches = [] if exact is None else [exact]
+            if not self.root.children:
+                return matches
+
+            levels = topic.split("/")
+            # Wildcards don't match topics starting with $ at the first level
+            system = topic.startswith("$")
+            nodes = [self.root]
+            for i, level in enumerate(levels):
+                wildcard = not (system and i == 0)
+                nxt = []
+                for node in nodes:
+                    children = node.children
+                    if wildcard and "#" in children:
+                        cb = children["#"].callback
+                        if cb is not None:
+                            matches.append(cb)
+                    child = children.get(level)
+                    if child is not None:
+                        nxt.append(child)
+                    if wildcard and "+" in children:
+                        nxt.append(children["+"])
+                if not nxt:
+                    return matches
+                nodes = nxt
+
+            for node in nodes:
+                if node.callback is not None:
+                    matches.append(node.callback)
+                # `a/#` also matches `a`
+                if "#" in node.children:
+                    cb = node.children["#"].callback
+                    if cb is not None:
+                        matches.append(cb)
+            return matches
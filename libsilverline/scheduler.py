@@ -0,0 +1,83 @@
+"""Deadline scheduler for timed profiler sends."""
+
+import time
+import heapq
+import logging
+import itertools
+import threading
+
+
+class Scheduler:
+    """Run callbacks at their deadlines on a single worker thread.
+
+    Pending calls are kept in a deadline heap, so scheduling and servicing
+    a call is O(log n) in the number of pending calls. Since calls are run
+    off the MQTT network thread, a delay for one module does not hold up
+    message handling for any other module.
+
+    Parameters
+    ----------
+    name : str
+        Worker thread name.
+    spin : float
+        If >0, waits for the last `spin` seconds before each deadline by
+        busy-waiting instead of sleeping, for more precise timing.
+    """
+
+    def __init__(self, name="scheduler", spin=0.):
+        self.name = name
+        self.spin = spin
+        self.log = logging.getLogger('scheduler')
+
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def call_at(self, deadline, func, *args):
+        """Call `func(*args)` at `deadline` (`time.perf_counter()` time)."""
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            heapq.heappush(self._heap, (deadline, next(self._seq), func, args))
+            self._cond.notify()
+
+    def call_later(self, delay, func, *args):
+        """Call `func(*args)` after `delay` seconds."""
+        self.call_at(time.perf_counter() + delay, func, *args)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.perf_counter()
+                    if wait <= self.spin:
+                        break
+                    self._cond.wait(wait - self.spin)
+                if self._stopped:
+                    return
+                deadline, _, func, args = heapq.heappop(self._heap)
+            while time.perf_counter() < deadline:
+                pass
+            try:
+                func(*args)
+            except Exception as e:
+                self.log.error("Scheduled call failed: %s", e)
+
+    def stop(self):
+        """Stop worker thread; pending calls are discarded."""
+        with self._cond:
+            self._stopped = True
+            self._heap.clear()
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
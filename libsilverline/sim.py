@@ -0,0 +1,352 @@
+"""Offline SilverLine simulator: MQTT broker, REST API, and runtimes."""
+
+import json
+import math
+import uuid
+import random
+import logging
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .broker import Broker
+from .codec import get_codec
+
+
+class ServiceTime:
+    """Module service time distribution.
+
+    Parameters
+    ----------
+    dist : str
+        Distribution: `fixed`, `exponential`, `uniform` (on [0, 2 * mean]),
+        or `lognormal` (with shape `sigma`).
+    mean : float
+        Mean service time, in seconds.
+    sigma : float
+        Shape parameter for `lognormal`.
+    """
+
+    def __init__(self, dist="fixed", mean=0., sigma=1.):
+        if dist not in {"fixed", "exponential", "uniform", "lognormal"}:
+            raise ValueError("Invalid service time distribution: {}".format(
+                dist))
+        self.dist = dist
+        self.mean = mean
+        self.sigma = sigma
+        self._mu = math.log(mean) - sigma**2 / 2 if mean > 0 else 0.
+
+    def sample(self):
+        """Draw service time."""
+        if self.mean <= 0 or self.dist == "fixed":
+            return self.mean
+        elif self.dist == "exponential":
+            return random.expovariate(1 / self.mean)
+        elif self.dist == "uniform":
+            return random.uniform(0, 2 * self.mean)
+        else:
+            return random.lognormvariate(self._mu, self.sigma)
+
+
+class _Module:
+    """Simulated module: a single FIFO server echoing its inputs."""
+
+    def __init__(self, sim, data):
+        self.sim = sim
+        self.data = data
+        self.uuid = data["uuid"]
+        self.topic_in = "benchmark/in/{}".format(self.uuid)
+        self.topic_out = "benchmark/out/{}".format(self.uuid)
+        self.busy_until = 0.
+        self.started = False
+        self.acked = False
+        self.subscribed = False
+        self.subscriber = sim.broker.subscribe_local(
+            self.topic_in, self.on_input)
+
+    def start(self):
+        """Finish startup; send ACK if someone is listening."""
+        self.started = True
+        self.ack()
+
+    def ack(self):
+        if self.started and self.subscribed and not self.acked:
+            self.acked = True
+            self.sim.broker.publish(self.topic_out, b"", qos=1)
+
+    def on_input(self, topic, payload):
+        if payload == b"exit":
+            self.sim.remove_module(self.uuid)
+            return
+        service = self.sim.service.sample()
+        if service <= 0:
+            self.sim.broker.publish(self.topic_out, payload, qos=1)
+        else:
+            loop = self.sim.broker.loop
+            self.busy_until = max(self.busy_until, loop.time()) + service
+            loop.call_at(
+                self.busy_until, self.sim.broker.publish, self.topic_out,
+                payload, 1)
+
+    def stop(self):
+        self.sim.broker.unsubscribe_local(self.topic_in, self.subscriber)
+
+
+class _RestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        self.server.sim.log.debug(format, *args)
+
+    def _send(self, code, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        if len(parts) < 2 or parts[0] != "api" or \
+                parts[1] not in {"runtimes", "modules"}:
+            return self._send(404, {"detail": "Not found."})
+
+        records = self.server.sim.listing(parts[1])
+        if len(parts) == 3:
+            match = [r for r in records if r["uuid"] == parts[2]]
+            if not match:
+                return self._send(404, {"detail": "Not found."})
+            return self._send(200, match[0])
+
+        size = self.server.sim.page_size
+        if size <= 0:
+            return self._send(200, records)
+        query = parse_qs(url.query)
+        page = int(query.get("page", ["1"])[0])
+        pages = max(1, math.ceil(len(records) / size))
+
+        def _link(i):
+            if 1 <= i <= pages:
+                return "http://{}:{}/api/{}/?page={}".format(
+                    *self.server.server_address[:2], parts[1], i)
+            return None
+
+        self._send(200, {
+            "count": len(records), "next": _link(page + 1),
+            "previous": _link(page - 1),
+            "results": records[(page - 1) * size:page * size]})
+
+
+class Simulator:
+    """Offline SilverLine simulator.
+
+    Runs an MQTT broker (see `Broker`), a stub of the orchestrator REST API
+    (`/api/runtimes/` and `/api/modules/`, with page number pagination), and
+    simulated runtimes, all in the current process.
+
+    Runtimes answer create/delete control messages (and profiling
+    reset/save messages) with a response carrying the same `object_id`.
+    Modules start after `startup` seconds, then send an empty ACK message
+    on `benchmark/out/{uuid}` once it has a subscriber, and echo each
+    `benchmark/in/{uuid}` message to `benchmark/out/{uuid}` after a service
+    time (one message at a time, in order). Modules exit on an `exit`
+    message.
+
+    Parameters
+    ----------
+    runtimes : int
+        Number of simulated runtimes; the first is named `test`, and the
+        others `test-1`, `test-2`, ....
+    realm : str
+        Realm name.
+    host : str
+        Address to listen on.
+    mqtt_port : int
+        MQTT port; 0 picks a free port.
+    http_port : int
+        REST API port; 0 picks a free port.
+    page_size : int
+        REST API page size; if 0, listings are not paginated.
+    service : str
+        Service time distribution (`fixed`, `exponential`, `uniform`, or
+        `lognormal`).
+    service_time : float
+        Mean service time, in seconds.
+    startup : float
+        Module startup time, in seconds.
+    codec : str
+        Control message codec.
+    """
+
+    def __init__(
+            self, runtimes=1, realm="realm", host="127.0.0.1", mqtt_port=0,
+            http_port=0, page_size=100, service="fixed", service_time=0.,
+            startup=0., codec="json"):
+        self.realm = realm
+        self.host = host
+        self.page_size = page_size
+        self.service = ServiceTime(service, service_time)
+        self.startup = startup
+        self.codec = get_codec(codec)
+        self.control = "{}/proc/control".format(realm)
+        self.log = logging.getLogger("sim")
+
+        self.broker = Broker(host=host, port=mqtt_port)
+        self.http_port = http_port
+        self._http = None
+
+        self._lock = threading.Lock()
+        self.runtimes = {}
+        self.modules = {}
+        for i in range(runtimes):
+            rt = str(uuid.uuid4())
+            self.runtimes[rt] = {
+                "uuid": rt, "name": "test-{}".format(i) if i else "test",
+                "children": []}
+
+    @property
+    def mqtt_port(self):
+        """MQTT broker port."""
+        return self.broker.port
+
+    def client_args(self):
+        """Arguments for `Client` to connect to this simulator."""
+        return {
+            "mqtt": self.host, "mqtt_port": self.mqtt_port,
+            "http": self.host, "http_port": self.http_port,
+            "realm": self.realm, "pwd": ""}
+
+    # -- State --------------------------------------------------------------
+
+    def listing(self, kind):
+        """Get REST API listing (`runtimes` or `modules`)."""
+        with self._lock:
+            if kind == "runtimes":
+                return [
+                    dict(rt, children=list(rt["children"]))
+                    for rt in self.runtimes.values()]
+            return [m.data for m in self.modules.values()]
+
+    def add_module(self, data):
+        """Add module (from a create request); returns False on failure."""
+        with self._lock:
+            rt = self.runtimes.get(data.get("parent"))
+            if rt is None or data.get("uuid") in self.modules:
+                return False
+            module = _Module(self, {
+                k: data.get(k) for k in
+                ["uuid", "name", "filename", "args", "env", "parent"]})
+            self.modules[module.uuid] = module
+            rt["children"].append(module.data)
+        if self.startup > 0:
+            self.broker.loop.call_later(self.startup, module.start)
+        else:
+            module.start()
+        return True
+
+    def remove_module(self, module):
+        """Remove module; returns False if it does not exist."""
+        with self._lock:
+            mod = self.modules.pop(module, None)
+            if mod is None:
+                return False
+            children = self.runtimes[mod.data["parent"]]["children"]
+            children.remove(mod.data)
+        mod.stop()
+        return True
+
+    def remove_runtime(self, runtime):
+        """Remove runtime and its modules; returns False if not found."""
+        with self._lock:
+            rt = self.runtimes.get(runtime)
+            children = [] if rt is None else list(rt["children"])
+        if rt is None:
+            return False
+        for mod in children:
+            self.remove_module(mod["uuid"])
+        with self._lock:
+            del self.runtimes[runtime]
+        return True
+
+    # -- Control messages ---------------------------------------------------
+
+    def _on_subscribe(self, topic):
+        if topic.startswith("benchmark/out/"):
+            mod = self.modules.get(topic[len("benchmark/out/"):])
+            if mod is not None:
+                mod.subscribed = True
+                mod.ack()
+
+    def _on_control(self, topic, payload):
+        try:
+            msg = self.codec.decode(payload)
+        except Exception:
+            return
+        # Profiling requests (`reset`, `save`) have no `type`.
+        if not isinstance(msg, dict) or msg.get("type", "req") != "req":
+            return
+
+        action, data = msg.get("action"), msg.get("data") or {}
+        if not isinstance(data, dict):
+            data = {"data": data}
+        if topic.endswith("/profile/control"):
+            ok = action in {"reset", "save"}
+        elif action == "create" and data.get("type") == "module":
+            ok = self.add_module(data)
+        elif action == "delete" and data.get("type") == "runtime":
+            ok = self.remove_runtime(data.get("uuid"))
+        elif action == "delete":
+            ok = self.remove_module(data.get("uuid"))
+        else:
+            ok = False
+
+        resp = {
+            "object_id": msg.get("object_id"), "action": action,
+            "type": "resp", "data": {
+                **data, "result": "ok" if ok else "error"}}
+        self.broker.publish(topic, self._encode(resp), qos=1)
+
+    def _encode(self, obj):
+        payload = self.codec.encode(obj)
+        return payload.encode() if isinstance(payload, str) else payload
+
+    # -- Lifecycle ----------------------------------------------------------
+
+    def start(self):
+        """Start broker and REST API server."""
+        self.broker.start()
+        self.broker.subscribe_hooks.append(self._on_subscribe)
+        for topic in [
+                "{}/#".format(self.control),
+                "{}/proc/profile/control".format(self.realm)]:
+            self.broker.subscribe_local(topic, self._on_control)
+
+        self._http = ThreadingHTTPServer(
+            (self.host, self.http_port), _RestHandler)
+        self._http.daemon_threads = True
+        self._http.sim = self
+        self.http_port = self._http.server_address[1]
+        threading.Thread(
+            target=self._http.serve_forever, name="rest", daemon=True).start()
+        self.log.info(
+            "Simulating %d runtimes: MQTT %s:%d, REST http://%s:%d/api",
+            len(self.runtimes), self.host, self.mqtt_port, self.host,
+            self.http_port)
+        return self
+
+    def stop(self):
+        """Stop broker and REST API server."""
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+        self.broker.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
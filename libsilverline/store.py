@@ -0,0 +1,195 @@
+"""Columnar, append-only profiling result store."""
+
+import os
+import json
+import uuid
+
+import numpy as np
+
+
+class ChunkWriter:
+    """Append-only writer for one stream of rows (e.g. one module).
+
+    Rows are written into preallocated column buffers; each time
+    `chunk_size` rows have been written, the buffers are saved as a new
+    chunk. Chunks are written to a temporary directory and renamed into
+    place, so readers never see partial chunks.
+
+    A writer with a single column can be used in place of a
+    `LatencyBuffer`: `append(sample)`, `len()`, and `array` behave the same.
+
+    Parameters
+    ----------
+    root : str
+        Store directory.
+    columns : dict
+        Column names (keys) and numpy dtypes (values).
+    chunk_size : int
+        Rows per chunk.
+    meta : dict
+        Metadata (runtime, module, path, parameters, ...) saved with each
+        chunk; must be JSON-serializable.
+    """
+
+    def __init__(self, root, columns, chunk_size=65536, meta={}):
+        self.root = root
+        self.columns = {k: np.dtype(v) for k, v in columns.items()}
+        self.chunk_size = chunk_size
+        self.meta = meta
+        self.id = uuid.uuid4().hex
+
+        self._buffers = [
+            np.empty(chunk_size, dtype=v) for v in self.columns.values()]
+        self._first = self._buffers[0]
+        self._single = len(self._buffers) == 1
+        self._rows = 0
+        self.chunks = []
+        self.size = 0
+
+    def append(self, *values):
+        """Append one row (values in column order)."""
+        if self._single:
+            self._first[self._rows] = values[0]
+        else:
+            for buf, v in zip(self._buffers, values):
+                buf[self._rows] = v
+        self._rows += 1
+        self.size += 1
+        if self._rows == self.chunk_size:
+            self.flush()
+
+    def extend(self, **arrays):
+        """Append many rows; columns are passed as arrays by name."""
+        data = [np.asarray(arrays[k], dtype=v)
+                for k, v in self.columns.items()]
+        n = len(data[0])
+        start = 0
+        while start < n:
+            k = min(n - start, self.chunk_size - self._rows)
+            for buf, col in zip(self._buffers, data):
+                buf[self._rows:self._rows + k] = col[start:start + k]
+            self._rows += k
+            self.size += k
+            start += k
+            if self._rows == self.chunk_size:
+                self.flush()
+
+    def __len__(self):
+        return self.size
+
+    def flush(self):
+        """Save buffered rows as a new chunk."""
+        if self._rows == 0:
+            return
+        name = "{}-{:06d}".format(self.id, len(self.chunks))
+        tmp = os.path.join(self.root, ".tmp-" + name)
+        os.makedirs(tmp)
+        for (col, dtype), buf in zip(self.columns.items(), self._buffers):
+            np.save(os.path.join(tmp, col + ".npy"), buf[:self._rows])
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({
+                "rows": self._rows,
+                "columns": {k: v.str for k, v in self.columns.items()},
+                "meta": self.meta}, f)
+        os.rename(tmp, os.path.join(self.root, name))
+        self.chunks.append(name)
+        self._rows = 0
+
+    def close(self):
+        """Flush remaining rows."""
+        self.flush()
+
+    def column(self, name):
+        """Get all rows of a column written so far (flushed and buffered)."""
+        idx = list(self.columns).index(name)
+        return np.concatenate([
+            np.load(os.path.join(self.root, c, name + ".npy"), mmap_mode="r")
+            for c in self.chunks
+        ] + [self._buffers[idx][:self._rows]])
+
+    @property
+    def array(self):
+        """All rows of the first column."""
+        return self.column(next(iter(self.columns)))
+
+
+class ResultStore:
+    """Columnar profiling result store.
+
+    Results are stored as a directory of chunks, each containing one `.npy`
+    file per column and a small `meta.json` with the row count, column
+    types, and user metadata. Chunks are immutable once written, so any
+    number of writers (e.g. `ClientPool` workers) may append to the same
+    store concurrently. Columns are memory-mapped when read, so only the
+    selected columns (and chunks) are ever loaded.
+
+    Parameters
+    ----------
+    path : str
+        Store directory; created if it does not exist.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def writer(self, columns, chunk_size=65536, **meta):
+        """Create an append-only writer; see `ChunkWriter`."""
+        return ChunkWriter(
+            self.path, columns, chunk_size=chunk_size, meta=meta)
+
+    def chunks(self, **where):
+        """List chunks, optionally filtered by metadata.
+
+        Parameters
+        ----------
+        where : dict
+            Metadata values to match (e.g. `module=...`).
+
+        Returns
+        -------
+        list[(str, dict)]
+            Chunk name and contents of its `meta.json`, in name order.
+        """
+        res = []
+        for name in sorted(os.listdir(self.path)):
+            if name.startswith("."):
+                continue
+            try:
+                with open(os.path.join(self.path, name, "meta.json")) as f:
+                    info = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if all(info["meta"].get(k) == v for k, v in where.items()):
+                res.append((name, info))
+        return res
+
+    def iter_chunks(self, columns, **where):
+        """Iterate over chunks as memory-mapped columns.
+
+        Yields
+        ------
+        (dict, dict)
+            Chunk metadata, and selected columns (read-only `np.memmap`).
+        """
+        for name, info in self.chunks(**where):
+            yield info["meta"], {
+                c: np.load(
+                    os.path.join(self.path, name, c + ".npy"), mmap_mode="r")
+                for c in columns}
+
+    def load(self, columns, **where):
+        """Load selected columns across all (matching) chunks.
+
+        Returns
+        -------
+        dict
+            Column names (keys) and concatenated arrays (values).
+        """
+        parts = {c: [] for c in columns}
+        for _, data in self.iter_chunks(columns, **where):
+            for c in columns:
+                parts[c].append(data[c])
+        return {
+            c: np.concatenate(v) if v else np.empty(0)
+            for c, v in parts.items()}
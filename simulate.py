@@ -0,0 +1,7 @@
+"""Run offline simulator (MQTT broker, REST API, and runtimes)."""
+
+from libsilverline import _sim
+
+
+if __name__ == '__main__':
+    _sim._main(_sim._parse().parse_args())